@@ -1,17 +1,33 @@
 import os
 import io
+import asyncio
 import base64
+import contextlib
+import binascii
+import json
+import time
+import threading
+from typing import List
 import numpy as np
-import tensorflow as tf
-from fastapi import FastAPI, UploadFile, File, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from PIL import Image
 import cv2
 
-from backend.utils import preprocess_image, get_class_name, CLASSES
-from backend.train import train_traffic_sign_model
+from backend.utils import (
+    preprocess_image, preprocess_batch, extract_archive, get_class_name, ArchiveLimitError, CLASSES
+)
+from backend.batching import InferenceBatcher
+from backend.workers import ModelWorkerPool
+from backend.runtime import load_runtime, runtime_model_path
+from backend.jobs import TrainingJob
+from backend.dataset import DATA_DIR
+from backend.evaluate import evaluate_model
+from backend.cache import PredictionCache
+from backend.registry import ModelRegistry
 
 app = FastAPI(title="Traffic Sign Recognition API")
 
@@ -23,25 +39,133 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Where training writes new models; serving loads versions from the registry
 MODEL_PATH = os.path.join(os.getcwd(), 'models', 'traffic_sign_model.h5')
+# Runtime used for serving: keras, tflite, tflite_int8 or onnx (see backend/export.py)
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "keras")
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", 32))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", 5))
+BULK_BATCH_SIZE = int(os.environ.get("BULK_BATCH_SIZE", 256))
+# Limits for one /predict_batch request, counting every image in every archive
+BULK_MAX_IMAGES = int(os.environ.get("BULK_MAX_IMAGES", 50000))
+BULK_MAX_BYTES = int(os.environ.get("BULK_MAX_BYTES", 512 * 1024 * 1024))
+# Number of model replica processes; 0 runs inference inside the API process
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", 0))
+# Cores a training job may use; the rest stay free for serving
+TRAINING_CPUS = int(os.environ.get("TRAINING_CPUS", max(1, (os.cpu_count() or 2) // 2)))
+# Number of cached predictions for repeated images; 0 disables the cache
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", 10000))
 model = None
+model_version = None
+active_model_path = None
+worker_pool = None
+training_job = None
+prediction_cache = PredictionCache(PREDICTION_CACHE_SIZE)
+registry = ModelRegistry()
+model_swap_lock = threading.Lock()
+model_swap_status = {"status": "idle"}
 
 
 training_status = {"status": "idle", "progress": 0, "logs": []}
+training_status_lock = threading.Lock()
+# (event loop, asyncio.Event) for every open /train/stream, set when the status changes
+training_listeners = set()
 
-def load_model_if_exists():
-    global model
-    if os.path.exists(MODEL_PATH):
+def warm_up(runtime):
+    # Run every batch shape we serve once, so the first real request doesn't pay for setup
+    sizes = sorted({1, BATCH_MAX_SIZE, BULK_BATCH_SIZE})
+    if hasattr(runtime, 'set_batch_sizes'):
+        # TFLite pads every batch up to one of these, so only they need interpreters
+        runtime.set_batch_sizes(sizes)
+    for size in sizes:
+        runtime.predict(np.zeros((size, 32, 32, 3), dtype=np.float32))
+
+def activate_model(version, rollback=False):
+    """
+    Verify, load and warm up a registry version, then swap it in with a single
+    reference assignment. Requests already running keep the model they started with.
+    """
+    global model, model_version, active_model_path
+    with model_swap_lock:
+        path = registry.model_path(version)
+        registry.verify(version, os.path.basename(runtime_model_path(path, MODEL_BACKEND)))
+        if INFERENCE_WORKERS > 0:
+            # Replicas load the model in their own processes, see start_worker_pool
+            if worker_pool is not None:
+                worker_pool.reload(path)
+        else:
+            new_model = load_runtime(path, MODEL_BACKEND)
+            warm_up(new_model)
+            model = new_model
+        active_model_path = path
+        model_version = version
+        prediction_cache.invalidate()
+        registry.set_active(version, rollback=rollback)
+        print(f"Model {version} loaded successfully ({MODEL_BACKEND}).")
+
+def activate_in_background(version, rollback=False):
+    def run():
+        model_swap_status.update(status="loading", version=version, error=None)
         try:
-            model = tf.keras.models.load_model(MODEL_PATH)
-            print("Model loaded successfully.")
+            activate_model(version, rollback)
+            model_swap_status.update(status="idle")
         except Exception as e:
-            print(f"Error loading model: {e}")
-            model = None
-    else:
+            model_swap_status.update(status="failed", error=str(e))
+    threading.Thread(target=run, daemon=True).start()
+
+def load_model_if_exists():
+    # Adopt a model trained before the registry existed as its first version
+    if registry.active_version() is None and os.path.exists(MODEL_PATH):
+        registry.set_active(registry.register(MODEL_PATH, source="models/traffic_sign_model.h5"))
+
+    version = registry.active_version()
+    if version is None:
         print("Model file not found. Please train the model first.")
+        return
+    try:
+        activate_model(version)
+    except Exception as e:
+        print(f"Error loading model: {e}")
 
-load_model_if_exists()
+def start_worker_pool():
+    global worker_pool
+    if INFERENCE_WORKERS <= 0 or active_model_path is None or worker_pool is not None:
+        return
+    pool = ModelWorkerPool(active_model_path, num_workers=INFERENCE_WORKERS, backend=MODEL_BACKEND)
+    pool.start()
+    worker_pool = pool
+    prediction_cache.invalidate()
+    print(f"Started {INFERENCE_WORKERS} inference workers.")
+
+def model_ready():
+    return worker_pool is not None or model is not None
+
+def run_model(batch, runtime=None):
+    if worker_pool is not None:
+        return worker_pool.predict(batch)
+    return (runtime or model).predict(batch)
+
+batcher = InferenceBatcher(
+    run_model,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    max_concurrency=max(1, INFERENCE_WORKERS)
+)
+
+@app.on_event("startup")
+def on_startup():
+    # Done here rather than at import: spawned training and replica processes
+    # re-import this module and must not load, warm up or hash the model
+    load_model_if_exists()
+    start_worker_pool()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await batcher.stop()
+    if training_job is not None:
+        training_job.stop()
+    if worker_pool is not None:
+        worker_pool.stop()
 
 class PredictionResponse(BaseModel):
     class_id: int
@@ -52,32 +176,51 @@ class PredictionResponse(BaseModel):
 async def root():
     return {"message": "Traffic Sign Recognition API is running"}
 
+def prediction_result(preds):
+    class_id = int(np.argmax(preds))
+    return {
+        "class_id": class_id,
+        "class_name": get_class_name(class_id),
+        "confidence": float(np.max(preds))
+    }
+
+async def classify_image_bytes(img_bytes):
+    """
+    Classify one encoded image, answering repeats from the prediction cache
+    without decoding. Returns None if the image can't be decoded.
+    """
+    key = prediction_cache.key(img_bytes)
+    result = prediction_cache.get(key)
+    if result is not None:
+        return result
+
+    # JPEG decode and resize would otherwise block the event loop
+    processed_img = await run_in_threadpool(preprocess_image, img_bytes)
+    if processed_img is None:
+        return None
+
+    preds = await batcher.submit(processed_img[0])
+    result = prediction_result(preds)
+    prediction_cache.put(key, result)
+    return result
+
 @app.post("/predict", response_model=PredictionResponse)
 async def predict(file: UploadFile = File(...)):
-    global model
-    if model is None:
+    if not model_ready():
         return JSONResponse(status_code=400, content={"message": "Model not loaded. Please train first."})
     
     try:
         contents = await file.read()
-        processed_img = preprocess_image(contents)
-        
-        preds = model.predict(processed_img)
-        class_id = int(np.argmax(preds))
-        confidence = float(np.max(preds))
-        
-        return {
-            "class_id": class_id,
-            "class_name": get_class_name(class_id),
-            "confidence": confidence
-        }
+        result = await classify_image_bytes(contents)
+        if result is None:
+            return JSONResponse(status_code=400, content={"message": "Could not decode image"})
+        return result
     except Exception as e:
         return JSONResponse(status_code=500, content={"message": str(e)})
 
 @app.post("/predict_base64")
 async def predict_base64(data: dict):
-    global model
-    if model is None:
+    if not model_ready():
         return JSONResponse(status_code=400, content={"message": "Model not loaded. Please train first."})
     
     try:
@@ -89,57 +232,328 @@ async def predict_base64(data: dict):
         if "," in img_data:
             img_data = img_data.split(",")[1]
             
-        img_bytes = base64.b64decode(img_data)
-        processed_img = preprocess_image(img_bytes)
-        
-        preds = model.predict(processed_img)
-        class_id = int(np.argmax(preds))
-        confidence = float(np.max(preds))
-        
-        return {
-            "class_id": class_id,
-            "class_name": get_class_name(class_id),
-            "confidence": confidence
-        }
+        try:
+            img_bytes = base64.b64decode(img_data)
+        except binascii.Error:
+            return JSONResponse(status_code=400, content={"message": "Invalid base64 image data"})
+        result = await classify_image_bytes(img_bytes)
+        if result is None:
+            return JSONResponse(status_code=400, content={"message": "Could not decode image"})
+        return result
     except Exception as e:
         return JSONResponse(status_code=500, content={"message": str(e)})
 
-def run_training_task():
-    global training_status, model
-    training_status["status"] = "training"
+@app.post("/predict_batch")
+async def predict_batch(files: List[UploadFile] = File(...)):
+    """
+    Classify many images in one request. Accepts several uploaded images
+    and/or zip/tar archives of crops; results are returned in input order.
+    """
+    if not model_ready():
+        return JSONResponse(status_code=400, content={"message": "Model not loaded. Please train first."})
+
+    items = []
+    errors = {}  # item index -> error for uploads that yield no image bytes
+    total_bytes = 0
+    for file in files:
+        contents = await file.read()
+        try:
+            # Inflating a large archive would otherwise block the event loop
+            members = await run_in_threadpool(
+                extract_archive, contents, BULK_MAX_IMAGES - len(items), BULK_MAX_BYTES - total_bytes
+            )
+        except ArchiveLimitError as e:
+            return JSONResponse(status_code=413, content={"message": str(e)})
+        except Exception as e:
+            # A corrupt archive (or member) fails only its own entry
+            errors[len(items)] = f"Could not read archive: {e}"
+            items.append((file.filename, None))
+            continue
+        if members is None:
+            members = [(file.filename, contents)]
+        items.extend(members)
+        total_bytes += sum(len(data) for _, data in members)
+        if len(items) > BULK_MAX_IMAGES or total_bytes > BULK_MAX_BYTES:
+            return JSONResponse(status_code=413, content={
+                "message": f"At most {BULK_MAX_IMAGES} images and {BULK_MAX_BYTES} bytes per request"
+            })
+
+    def cache_keys():
+        return [None if i in errors else prediction_cache.key(data) for i, (_, data) in enumerate(items)]
+
+    results = [None] * len(items)
+    keys = await run_in_threadpool(cache_keys)
+    for i, key in enumerate(keys):
+        if key is None:
+            results[i] = {"filename": items[i][0], "error": errors[i]}
+            continue
+        cached = prediction_cache.get(key)
+        if cached is not None:
+            results[i] = {"filename": items[i][0], **cached}
+    pending = [i for i, result in enumerate(results) if result is None]
+
+    current = model # All chunks use the same model even if a swap happens meanwhile
+    # Bounds how many decoded chunks are held in memory at once
+    slots = asyncio.Semaphore(max(1, INFERENCE_WORKERS))
+
+    async def classify_chunk(indices):
+        async with slots:
+            processed, decoded = await run_in_threadpool(preprocess_batch, [items[i][1] for i in indices])
+            valid = [i for i, ok in zip(indices, decoded) if ok]
+            preds = []
+            if valid:
+                batch = processed if decoded.all() else processed[decoded]
+                preds = await run_in_threadpool(run_model, batch, current)
+        for i, ok in zip(indices, decoded):
+            if not ok:
+                results[i] = {"filename": items[i][0], "error": "Could not decode image"}
+        for i, pred in zip(valid, preds):
+            result = prediction_result(pred)
+            prediction_cache.put(keys[i], result)
+            results[i] = {"filename": items[i][0], **result}
+
     try:
-        history = train_traffic_sign_model(epochs=10) # 10 epochs for demo
-        if history:
-            training_status["status"] = "completed"
-            training_status["history"] = history
-            load_model_if_exists() # Reload model
-        else:
-            training_status["status"] = "failed"
+        # Chunks run concurrently so every inference worker gets a share
+        await asyncio.gather(*[
+            classify_chunk(pending[i:i + BULK_BATCH_SIZE]) for i in range(0, len(pending), BULK_BATCH_SIZE)
+        ])
     except Exception as e:
-        training_status["status"] = "failed"
-        training_status["error"] = str(e)
+        return JSONResponse(status_code=500, content={"message": str(e)})
+
+    failed = sum("error" in result for result in results)
+    return {"count": len(results), "failed": failed, "results": results}
+
+@app.websocket("/ws/stream")
+async def stream_predictions(websocket: WebSocket):
+    """
+    Live video inference. Each binary message is a 4-byte big-endian frame id
+    followed by a JPEG; each classified frame is answered with a JSON result
+    carrying its `frame_id`. Only the newest frame is kept: frames arriving
+    while one is being classified replace each other, and `dropped` counts them.
+    """
+    await websocket.accept()
+    if not model_ready():
+        await websocket.send_json({"message": "Model not loaded. Please train first."})
+        await websocket.close(code=1013)
+        return
+
+    latest = None
+    dropped = 0
+    connected = True
+    frame_ready = asyncio.Event()
+
+    async def receive_frames():
+        nonlocal latest, dropped, connected
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                data = message.get("bytes")
+                if not data or len(data) <= 4:
+                    continue
+                if latest is not None:
+                    dropped += 1
+                latest = (int.from_bytes(data[:4], 'big'), data[4:], time.perf_counter())
+                frame_ready.set()
+        finally:
+            connected = False
+            frame_ready.set()
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            await frame_ready.wait()
+            frame_ready.clear()
+            if not connected:
+                break
+            frame_id, img_bytes, received_at = latest
+            latest = None
+
+            try:
+                # Frames are rarely byte-identical, so they skip the prediction cache
+                processed = await run_in_threadpool(preprocess_image, img_bytes)
+                if processed is None:
+                    result = {"error": "Could not decode image"}
+                else:
+                    result = prediction_result(await batcher.submit(processed[0]))
+            except Exception as e:
+                result = {"error": str(e)}
+
+            await websocket.send_json({
+                "frame_id": frame_id,
+                **result,
+                "dropped": dropped,
+                "latency_ms": round((time.perf_counter() - received_at) * 1000, 2)
+            })
+    except (WebSocketDisconnect, RuntimeError):
+        pass  # Client went away mid-send
+    finally:
+        receiver.cancel()
+        # Retrieve the receiver's outcome: a normal disconnect is expected,
+        # anything else (e.g. a failed receive) propagates from here
+        with contextlib.suppress(asyncio.CancelledError, WebSocketDisconnect):
+            await receiver
+
+def on_training_event(event):
+    """
+    Called from the training job's monitor thread for every progress event.
+    """
+    event = dict(event)
+    event_type = event.pop("type")
+    if event_type == "completed":
+        history = event["history"]
+        # Runs on the monitor thread: any failure here must still end up in the
+        # status, or it stays "training" and every later /train is refused
+        try:
+            version = registry.register(
+                MODEL_PATH,
+                source="training",
+                val_accuracy=history.get("val_accuracy", [None])[-1]
+            )
+            activate_model(version) # Swap in the new model
+            start_worker_pool()
+        except Exception as e:
+            event_type, event["error"] = "failed", f"Trained model could not be put into service: {e}"
+
+    with training_status_lock:
+        if event_type == "completed":
+            training_status.update(status="completed", progress=100, history=event["history"])
+        elif event_type == "failed":
+            training_status.update(status="failed", error=event["error"])
+        else:
+            training_status.update(event)
+            if event_type == "epoch":
+                training_status["logs"].append(event)
+    notify_training_listeners()
+
+def notify_training_listeners():
+    for loop, changed in list(training_listeners):
+        loop.call_soon_threadsafe(changed.set)
 
 @app.post("/train")
-async def start_training(background_tasks: BackgroundTasks):
+async def start_training():
+    global training_job
     if training_status["status"] == "training":
         return {"message": "Training already in progress"}
-    
-    background_tasks.add_task(run_training_task)
+
+    with training_status_lock:
+        training_status.clear()
+        training_status.update(status="training", progress=0, logs=[])
+    notify_training_listeners()
+    training_job = TrainingJob(
+        on_training_event,
+        epochs=10, # 10 epochs for demo
+        num_cpus=TRAINING_CPUS,
+        export_backend=MODEL_BACKEND
+    )
+    training_job.start()
     return {"message": "Training started in background"}
 
 @app.get("/train/status")
 async def get_training_status():
     return training_status
 
+def training_status_json():
+    with training_status_lock:
+        return json.dumps(training_status)
+
+@app.get("/train/stream")
+async def stream_training_status():
+    """
+    Server-sent events: one `data:` message with the full status whenever it
+    changes, ending once training has completed or failed.
+    """
+    async def events():
+        # Waits on the event loop, so open streams don't hold threadpool threads
+        listener = (asyncio.get_running_loop(), asyncio.Event())
+        training_listeners.add(listener)
+        try:
+            last = training_status_json()
+            yield f"data: {last}\n\n"
+            while training_status["status"] == "training":
+                try:
+                    await asyncio.wait_for(listener[1].wait(), 15)
+                except asyncio.TimeoutError:
+                    pass
+                listener[1].clear()
+                current = training_status_json()
+                if current != last:
+                    last = current
+                    yield f"data: {current}\n\n"
+                else:
+                    # Keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+            final = training_status_json()
+            if final != last:
+                yield f"data: {final}\n\n"
+        finally:
+            training_listeners.discard(listener)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/models")
+async def list_models():
+    return {
+        "active": model_version,
+        "backend": MODEL_BACKEND,
+        "swap": model_swap_status,
+        "versions": registry.versions()
+    }
+
+@app.post("/models/{version}/activate")
+async def activate_version(version: str):
+    if version not in [v["version"] for v in registry.versions()]:
+        return JSONResponse(status_code=404, content={"message": f"Unknown model version {version}"})
+    if model_swap_status["status"] == "loading":
+        return JSONResponse(status_code=409, content={"message": "A model swap is already in progress"})
+    activate_in_background(version)
+    return JSONResponse(status_code=202, content={"message": f"Activating {version}"})
+
+@app.post("/models/rollback")
+async def rollback_model():
+    version = registry.previous_version()
+    if version is None:
+        return JSONResponse(status_code=400, content={"message": "No previous model version to roll back to"})
+    if model_swap_status["status"] == "loading":
+        return JSONResponse(status_code=409, content={"message": "A model swap is already in progress"})
+    activate_in_background(version, rollback=True)
+    return JSONResponse(status_code=202, content={"message": f"Rolling back to {version}"})
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return prediction_cache.stats()
+
+@app.get("/workers/health")
+async def workers_health():
+    if worker_pool is None:
+        return {"mode": "in-process", "model_loaded": model is not None}
+    return {"mode": "process-pool", **worker_pool.health()}
+
+def evaluate_active_model():
+    """
+    Evaluate the serving model, making sure the metrics are stored under the
+    hash of the model that actually produced them.
+    """
+    if worker_pool is not None:
+        # Replicas reload in place, so hold off swaps until the evaluation is done
+        with model_swap_lock:
+            model_file = runtime_model_path(active_model_path, MODEL_BACKEND)
+            return evaluate_model(worker_pool.predict, model_file, DATA_DIR, BULK_BATCH_SIZE)
+
+    with model_swap_lock:
+        runtime, path = model, active_model_path
+    return evaluate_model(runtime.predict, runtime_model_path(path, MODEL_BACKEND), DATA_DIR, BULK_BATCH_SIZE)
+
 @app.get("/evaluate")
 async def evaluate():
-    if model is None:
+    if not model_ready():
         return JSONResponse(status_code=400, content={"message": "Model not loaded."})
-   
-    return {
-        "accuracy": 0.957, 
-        "confusion_matrix": "Evaluation logic can be expanded here"
-    }
+
+    try:
+        return await run_in_threadpool(evaluate_active_model)
+    except Exception as e:
+        return JSONResponse(status_code=500, content={"message": str(e)})
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,99 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class InferenceBatcher:
+    """
+    Coalesces concurrent single-image requests into one forward pass.
+
+    Requests are collected until `max_batch_size` images are queued or
+    `max_wait_ms` has passed since the first one arrived. The batch is then
+    run through `predict_fn` on a worker thread so the event loop stays free.
+    Up to `max_concurrency` batches may be in flight at once, which lets a
+    multi-replica backend keep all of its replicas busy.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=5, max_concurrency=1):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._queue = None
+        self._slots = None
+        self._worker = None
+        # The loop only keeps weak references to tasks, so dispatches are held here
+        self._inflight = set()
+
+    def _ensure_started(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, image):
+        """
+        Queue a single preprocessed image (H, W, C) and wait for its prediction row.
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future))
+        return await future
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._inflight:
+            # Let batches already on a worker thread answer their requests
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        items = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+        while len(items) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return items
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            try:
+                items = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            task = loop.create_task(self._dispatch(items))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, items):
+        loop = asyncio.get_running_loop()
+        try:
+            batch = np.stack([image for image, _ in items])
+            preds = await loop.run_in_executor(self._executor, self.predict_fn, batch)
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        for (_, future), pred in zip(items, preds):
+            if not future.done():
+                future.set_result(pred)
@@ -0,0 +1,60 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of prediction results keyed by a hash of the raw image
+    bytes and the model version that produced them.
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self.model_version = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, data):
+        return hashlib.blake2b(data, digest_size=16).digest(), self.model_version
+
+    def get(self, key):
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key, result):
+        if self.max_entries <= 0 or key[1] != self.model_version:
+            # Disabled, or computed by a model that has since been replaced
+            return
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        """
+        Called when a new model is loaded: drop every entry and bump the version.
+        """
+        with self._lock:
+            self.model_version += 1
+            self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "model_version": self.model_version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,249 @@
+import os
+import hashlib
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+DATA_DIR = os.path.join(os.getcwd(), 'data', 'gtsrb')
+TRAINING_ZIP = 'GTSRB_Final_Training_Images.zip'
+CACHE_DIR = os.path.join(os.getcwd(), 'data', 'cache')
+NUM_CLASSES = 43
+DECODE_CHUNK_SIZE = 256
+
+
+def find_image_root(data_dir):
+    """
+    Locate the folder holding the 00000..00042 class folders inside `data_dir`.
+    """
+    base_path = os.path.join(data_dir, 'GTSRB', 'Final_Training', 'Images')
+    if not os.path.exists(base_path):
+        base_path = os.path.join(data_dir, 'Final_Training', 'Images')
+
+    if not os.path.exists(base_path):
+        for root, dirs, files in os.walk(data_dir):
+            if '00000' in dirs:
+                base_path = root
+                break
+
+    if not os.path.exists(base_path):
+        raise Exception(f"Dataset path not found inside {data_dir}. Please ensure it extracted correctly.")
+    return base_path
+
+
+def list_image_files(base_path, max_per_class=None):
+    """
+    Returns [(path, class_id), ...] in a stable order, keeping at most
+    `max_per_class` images per class.
+    """
+    files = []
+    for class_id in range(NUM_CLASSES):
+        class_path = os.path.join(base_path, format(class_id, '05d'))
+        if not os.path.exists(class_path):
+            continue
+
+        names = sorted(n for n in os.listdir(class_path) if n.lower().endswith(('.ppm', '.jpg', '.png')))
+        if max_per_class is not None:
+            names = names[:max_per_class]
+        files.extend((os.path.join(class_path, name), class_id) for name in names)
+    return files
+
+
+def list_zip_members(zip_path, max_per_class=None):
+    """
+    Returns [(member name, class_id), ...] for the training images inside the
+    GTSRB zip, in the same order as list_image_files.
+    """
+    by_class = {}
+    with zipfile.ZipFile(zip_path) as zf:
+        for name in zf.namelist():
+            parts = name.split('/')
+            if len(parts) < 2 or not parts[-1].lower().endswith(('.ppm', '.jpg', '.png')):
+                continue
+            if parts[-2].isdigit() and int(parts[-2]) < NUM_CLASSES:
+                by_class.setdefault(int(parts[-2]), []).append(name)
+
+    members = []
+    for class_id in sorted(by_class):
+        names = sorted(by_class[class_id], key=lambda n: n.rsplit('/', 1)[-1])
+        if max_per_class is not None:
+            names = names[:max_per_class]
+        members.extend((name, class_id) for name in names)
+    return members
+
+
+def list_dataset(data_dir, max_per_class=None):
+    """
+    Returns (source, files). If the downloaded zip is present, images are read
+    straight out of it and `source` is the zip path; otherwise `source` is the
+    extracted image folder. `files` is [(path or member name, class_id), ...].
+    """
+    zip_path = os.path.join(data_dir, TRAINING_ZIP)
+    if os.path.exists(zip_path) and zipfile.is_zipfile(zip_path):
+        members = list_zip_members(zip_path, max_per_class)
+        if members:
+            return zip_path, members
+
+    base_path = find_image_root(data_dir)
+    return base_path, list_image_files(base_path, max_per_class)
+
+
+def fingerprint(files, source, target_size, max_per_class):
+    """
+    Cache key covering the decode settings and every source file's name and
+    size, plus its mtime on disk or its CRC inside the zip.
+    """
+    digest = hashlib.sha1(f"{target_size}|{max_per_class}".encode())
+    if source.endswith('.zip'):
+        # The central directory already holds sizes and CRCs, no member is read
+        with zipfile.ZipFile(source) as zf:
+            for name, class_id in files:
+                info = zf.getinfo(name)
+                digest.update(f"{name}|{class_id}|{info.file_size}|{info.CRC}\n".encode())
+        return digest.hexdigest()[:16]
+
+    for path, class_id in files:
+        stat = os.stat(path)
+        digest.update(f"{os.path.relpath(path, source)}|{class_id}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()[:16]
+
+
+def _resize_decoded(decoded, count, target_size):
+    images = np.empty((count, target_size[1], target_size[0], 3), dtype=np.uint8)
+    labels = np.empty(count, dtype=np.int64)
+    count = 0
+    for img, class_id in decoded:
+        if img is None:
+            continue
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        images[count] = cv2.resize(img, target_size)
+        labels[count] = class_id
+        count += 1
+    return images[:count], labels[:count]
+
+
+def decode_chunk(args):
+    """
+    Decode, convert to RGB and resize a chunk of image files. Runs in a worker process.
+    Returns (uint8 images, labels) for the files that decoded successfully.
+    """
+    files, target_size = args
+    decoded = ((cv2.imread(path), class_id) for path, class_id in files)
+    return _resize_decoded(decoded, len(files), target_size)
+
+
+def decode_bytes_chunk(args):
+    """
+    Same as decode_chunk, for (encoded bytes, class_id) pairs read from an archive.
+    """
+    items, target_size = args
+    decoded = ((cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR), class_id) for data, class_id in items)
+    return _resize_decoded(decoded, len(items), target_size)
+
+
+def decode_files(files, target_size, max_workers=None, executor_class=ProcessPoolExecutor):
+    chunks = [(files[i:i + DECODE_CHUNK_SIZE], target_size) for i in range(0, len(files), DECODE_CHUNK_SIZE)]
+    with executor_class(max_workers=max_workers) as executor:
+        return list(executor.map(decode_chunk, chunks))
+
+
+def decode_zip(zip_path, members, target_size, max_workers=None, executor_class=ProcessPoolExecutor):
+    """
+    Read members out of the zip in one pass and decode them in a process pool
+    (or `executor_class`), without extracting anything. At most two chunks per
+    worker are held in memory while the rest of the archive is still being read.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    results, pending = [], deque()
+    with zipfile.ZipFile(zip_path) as zf, executor_class(max_workers=max_workers) as executor:
+        for i in range(0, len(members), DECODE_CHUNK_SIZE):
+            items = [(zf.read(name), class_id) for name, class_id in members[i:i + DECODE_CHUNK_SIZE]]
+            pending.append(executor.submit(decode_bytes_chunk, (items, target_size)))
+            if len(pending) >= 2 * max_workers:
+                results.append(pending.popleft().result())
+        results.extend(future.result() for future in pending)
+    return results
+
+
+def decode_dataset(source, files, target_size, max_workers=None, executor_class=ProcessPoolExecutor):
+    """
+    Decode everything returned by list_dataset into a list of (images, labels) chunks.
+    Pass executor_class=ThreadPoolExecutor inside a server, where starting
+    processes is unwelcome; OpenCV releases the GIL while decoding.
+    """
+    if source.endswith('.zip'):
+        return decode_zip(source, files, target_size, max_workers, executor_class)
+    return decode_files(files, target_size, max_workers, executor_class)
+
+
+def write_cache(results, images_path, labels_path, target_size):
+    """
+    Write decoded chunks to .npy files that can be memory-mapped. Files are
+    written under a temporary name and renamed, so a crash never leaves a
+    truncated cache behind.
+    """
+    total = sum(len(labels) for _, labels in results)
+    tmp_images, tmp_labels = images_path + '.tmp.npy', labels_path + '.tmp.npy'
+
+    images = np.lib.format.open_memmap(
+        tmp_images, mode='w+', dtype=np.uint8, shape=(total, target_size[1], target_size[0], 3)
+    )
+    labels = np.empty(total, dtype=np.int64)
+    offset = 0
+    for chunk_images, chunk_labels in results:
+        images[offset:offset + len(chunk_labels)] = chunk_images
+        labels[offset:offset + len(chunk_labels)] = chunk_labels
+        offset += len(chunk_labels)
+    images.flush()
+    del images
+    np.save(tmp_labels, labels)
+
+    os.replace(tmp_images, images_path)
+    os.replace(tmp_labels, labels_path)
+
+
+def load_cached_dataset(data_dir, target_size=(32, 32), max_per_class=None, cache_dir=CACHE_DIR, max_workers=None,
+                        executor_class=ProcessPoolExecutor):
+    """
+    Returns (images, labels), where images is a read-only memory-mapped uint8
+    array of shape (N, H, W, 3). The first call decodes the dataset in parallel
+    and writes the cache; later calls with the same files and settings reuse it.
+    """
+    source, files = list_dataset(data_dir, max_per_class)
+    key = fingerprint(files, source, target_size, max_per_class)
+
+    images_path = os.path.join(cache_dir, f"gtsrb_{target_size[0]}x{target_size[1]}_{key}_images.npy")
+    labels_path = os.path.join(cache_dir, f"gtsrb_{target_size[0]}x{target_size[1]}_{key}_labels.npy")
+
+    if not (os.path.exists(images_path) and os.path.exists(labels_path)):
+        print(f"Decoding {len(files)} images from {source} into cache...")
+        os.makedirs(cache_dir, exist_ok=True)
+        results = decode_dataset(source, files, target_size, max_workers, executor_class)
+        write_cache(results, images_path, labels_path, target_size)
+    else:
+        print(f"Using cached dataset: {images_path}")
+
+    return np.load(images_path, mmap_mode='r'), np.load(labels_path)
+
+
+def split_indices(num_samples, test_size=0.2, random_state=42):
+    """
+    Train/validation split shared by training, export and evaluation.
+    Same indices as sklearn's train_test_split(np.arange(num_samples),
+    test_size, random_state), without importing sklearn.
+    """
+    n_test = int(np.ceil(test_size * num_samples))
+    permutation = np.random.RandomState(random_state).permutation(num_samples)
+    return permutation[n_test:], permutation[:n_test]
+
+
+def load_validation_split(data_dir, target_size=(32, 32), executor_class=ProcessPoolExecutor):
+    """
+    The held-out validation images and labels of the training split.
+    """
+    X, y = load_cached_dataset(data_dir, target_size, executor_class=executor_class)
+    _, val_idx = split_indices(len(y))
+    val_idx = np.sort(val_idx)
+    return X[val_idx], y[val_idx]
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from backend.dataset import decode_files, load_validation_split, NUM_CLASSES
+
+RESULTS_PATH = os.path.join(os.getcwd(), 'models', 'evaluation_cache.json')
+
+_results = None
+_hashes = {}
+_lock = threading.Lock()
+
+
+def file_sha256(path):
+    """
+    SHA-256 of a model file, memoized on (size, mtime) so repeat calls don't re-read it.
+    """
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    if key not in _hashes:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        _hashes[key] = digest.hexdigest()
+    return _hashes[key]
+
+
+def load_test_set(data_dir, target_size=(32, 32)):
+    """
+    The official GTSRB test set (Final_Test/Images + GT-final_test.csv), if present locally.
+    """
+    for images_dir in (os.path.join(data_dir, 'GTSRB', 'Final_Test', 'Images'),
+                       os.path.join(data_dir, 'Final_Test', 'Images')):
+        labels_csv = os.path.join(images_dir, 'GT-final_test.csv')
+        if not os.path.exists(labels_csv):
+            labels_csv = os.path.join(data_dir, 'GT-final_test.csv')
+        if os.path.isdir(images_dir) and os.path.exists(labels_csv):
+            break
+    else:
+        return None
+
+    files = []
+    with open(labels_csv) as f:
+        header = f.readline().strip().split(';')
+        name_col, class_col = header.index('Filename'), header.index('ClassId')
+        for line in f:
+            row = line.strip().split(';')
+            if len(row) > class_col:
+                files.append((os.path.join(images_dir, row[name_col]), int(row[class_col])))
+
+    # Threads rather than processes: this runs inside the API server
+    results = decode_files(files, target_size, executor_class=ThreadPoolExecutor)
+    return np.concatenate([x for x, _ in results]), np.concatenate([y for _, y in results])
+
+
+def compute_metrics(y_true, y_pred, num_classes=NUM_CLASSES):
+    confusion = np.bincount(y_true * num_classes + y_pred, minlength=num_classes * num_classes)
+    confusion = confusion.reshape(num_classes, num_classes)
+    true_positives = np.diag(confusion)
+    predicted = confusion.sum(axis=0)
+    actual = confusion.sum(axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predicted > 0, true_positives / predicted, 0.0)
+        recall = np.where(actual > 0, true_positives / actual, 0.0)
+
+    return {
+        "accuracy": float(true_positives.sum() / max(len(y_true), 1)),
+        "per_class": [
+            {"class_id": i, "precision": float(precision[i]), "recall": float(recall[i]), "support": int(actual[i])}
+            for i in range(num_classes)
+        ],
+        "confusion_matrix": confusion.tolist(),
+    }
+
+
+def evaluate_predictions(predict_fn, X, y, batch_size=512):
+    """
+    Run uint8 images through `predict_fn` in large float32 batches and score them.
+    """
+    y_pred = np.empty(len(X), dtype=np.int64)
+    start = time.perf_counter()
+    for i in range(0, len(X), batch_size):
+        batch = np.asarray(X[i:i + batch_size], dtype=np.float32) / 255.0
+        y_pred[i:i + batch_size] = np.argmax(predict_fn(batch), axis=1)
+    elapsed = time.perf_counter() - start
+
+    metrics = compute_metrics(np.asarray(y, dtype=np.int64), y_pred)
+    metrics.update({
+        "samples": int(len(X)),
+        "seconds": round(elapsed, 3),
+        "images_per_second": round(len(X) / elapsed, 1) if elapsed > 0 else None,
+    })
+    return metrics
+
+
+def _load_results():
+    global _results
+    if _results is None:
+        _results = {}
+        if os.path.exists(RESULTS_PATH):
+            try:
+                with open(RESULTS_PATH) as f:
+                    _results = json.load(f)
+            except (OSError, ValueError):
+                pass
+    return _results
+
+
+def _save_results(results):
+    os.makedirs(os.path.dirname(RESULTS_PATH), exist_ok=True)
+    tmp_path = RESULTS_PATH + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(results, f)
+    os.replace(tmp_path, RESULTS_PATH)
+
+
+def evaluate_model(predict_fn, model_path, data_dir, batch_size=512):
+    """
+    Evaluate the model stored at `model_path` on the GTSRB test set if it is
+    available locally, else on the held-out validation split. Results are
+    cached by the model file's hash, so only a new model is re-evaluated.
+    `predict_fn` must serve that same file: callers pass a snapshot of the
+    runtime and its path, never the live global model.
+    """
+    model_hash = file_sha256(model_path)
+    with _lock:
+        results = _load_results()
+        if model_hash in results:
+            return dict(results[model_hash], cached=True)
+
+        data = load_test_set(data_dir)
+        dataset = "gtsrb_test"
+        if data is None:
+            data = load_validation_split(data_dir, executor_class=ThreadPoolExecutor)
+            dataset = "validation_split"
+        X, y = data
+        if len(X) == 0:
+            raise Exception("No evaluation images found.")
+
+        metrics = evaluate_predictions(predict_fn, X, y, batch_size)
+        metrics.update({"dataset": dataset, "model_sha256": model_hash})
+        results[model_hash] = metrics
+        _save_results(results)
+        return dict(metrics, cached=False)
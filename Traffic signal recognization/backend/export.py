@@ -0,0 +1,133 @@
+import os
+import argparse
+import tempfile
+
+import numpy as np
+import tensorflow as tf
+
+from backend.train import load_data, split_indices, DATA_DIR, MODEL_PATH
+from backend.runtime import load_runtime, runtime_model_path
+
+
+def load_export_data(data_dir=DATA_DIR, calibration_samples=500):
+    """
+    Returns (calibration images, validation images, validation labels) using the
+    same train/validation split as training, or None if the dataset is missing.
+    """
+    try:
+        X, y = load_data(data_dir)
+    except Exception as e:
+        print(f"Dataset not available: {e}")
+        return None
+    if len(X) == 0:
+        return None
+
+    train_idx, val_idx = split_indices(len(y))
+    rng = np.random.default_rng(0)
+    calibration_idx = np.sort(rng.choice(train_idx, size=min(calibration_samples, len(train_idx)), replace=False))
+    val_idx = np.sort(val_idx)
+    return (
+        X[calibration_idx].astype(np.float32) / 255.0,
+        X[val_idx].astype(np.float32) / 255.0,
+        y[val_idx]
+    )
+
+
+def export_tflite(keras_model, path, calibration_images=None):
+    """
+    Convert to TFLite. With calibration images the weights and activations are
+    quantized to int8 (post-training quantization); the model keeps a float
+    input/output interface so callers don't change.
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    if calibration_images is not None:
+        def representative_dataset():
+            for img in calibration_images:
+                yield [img[np.newaxis]]
+
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+
+    with open(path, 'wb') as f:
+        f.write(converter.convert())
+    return path
+
+
+def export_onnx(keras_model, path):
+    try:
+        import tf2onnx
+    except ImportError:
+        raise Exception("ONNX export needs tf2onnx: pip install tf2onnx onnxruntime")
+
+    signature = (tf.TensorSpec((None,) + tuple(keras_model.input_shape[1:]), tf.float32, name='input'),)
+    tf2onnx.convert.from_keras(keras_model, input_signature=signature, output_path=path)
+    return path
+
+
+def accuracy(runtime, X, y, batch_size=256):
+    correct = 0
+    for i in range(0, len(X), batch_size):
+        preds = runtime.predict(X[i:i + batch_size])
+        correct += int(np.sum(np.argmax(preds, axis=1) == y[i:i + batch_size]))
+    return correct / len(X)
+
+
+def export_model(backends=('tflite',), model_path=MODEL_PATH, data_dir=DATA_DIR, calibration_samples=500):
+    """
+    Export the trained .h5 model for each requested backend ('tflite',
+    'tflite_int8', 'onnx') and report each artifact's accuracy and size
+    against the original Keras model.
+    """
+    if not os.path.exists(model_path):
+        raise Exception(f"Model not found at {model_path}. Please train the model first.")
+
+    keras_model = tf.keras.models.load_model(model_path)
+    data = load_export_data(data_dir, calibration_samples)
+    if data is None and 'tflite_int8' in backends:
+        raise Exception("int8 quantization needs the GTSRB dataset for calibration.")
+
+    report = {'keras': {'path': model_path, 'size_mb': round(os.path.getsize(model_path) / 1e6, 2)}}
+    if data is not None:
+        calibration, X_val, y_val = data
+        report['keras']['accuracy'] = accuracy(load_runtime(model_path, 'keras'), X_val, y_val)
+
+    for backend in backends:
+        path = runtime_model_path(model_path, backend)
+        # Write to a temp file first so a running API never loads a half-written artifact
+        fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(path)[1], dir=os.path.dirname(path))
+        os.close(fd)
+        try:
+            if backend == 'onnx':
+                export_onnx(keras_model, tmp_path)
+            else:
+                export_tflite(keras_model, tmp_path, calibration if backend == 'tflite_int8' else None)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        entry = {'path': path, 'size_mb': round(os.path.getsize(path) / 1e6, 2)}
+        if data is not None:
+            entry['accuracy'] = accuracy(load_runtime(model_path, backend), X_val, y_val)
+            entry['accuracy_delta'] = entry['accuracy'] - report['keras']['accuracy']
+        report[backend] = entry
+        print(f"Exported {backend} model to {path}")
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the traffic sign model to TFLite/ONNX.")
+    parser.add_argument('--backends', nargs='+', default=['tflite', 'tflite_int8'],
+                        choices=['tflite', 'tflite_int8', 'onnx'])
+    parser.add_argument('--calibration-samples', type=int, default=500)
+    args = parser.parse_args()
+
+    report = export_model(args.backends, calibration_samples=args.calibration_samples)
+    for backend, entry in report.items():
+        line = f"{backend:12s} {entry['size_mb']:8.2f} MB"
+        if 'accuracy' in entry:
+            line += f"  accuracy {entry['accuracy']:.4f}"
+        if 'accuracy_delta' in entry:
+            line += f"  delta {entry['accuracy_delta']:+.4f}"
+        print(line)
@@ -0,0 +1,103 @@
+import os
+import queue
+import threading
+import multiprocessing as mp
+
+
+def limit_threads(num_threads):
+    """
+    Cap the thread pools of TensorFlow and other OpenMP runtimes.
+    Must run before they are imported.
+    """
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(num_threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ['OMP_NUM_THREADS'] = str(num_threads)
+
+
+def limit_cpu(num_cpus):
+    """
+    Keep a training process off most cores and below serving priority.
+    Must run before TensorFlow is imported so its thread pools pick up the limit.
+    """
+    if hasattr(os, 'sched_setaffinity'):
+        available = sorted(os.sched_getaffinity(0))
+        # Use the last cores so the API process, usually on the first ones, keeps its share
+        os.sched_setaffinity(0, available[-num_cpus:])
+    if hasattr(os, 'nice'):
+        os.nice(10)
+    limit_threads(num_cpus)
+
+
+def _run_training(events, epochs, batch_size, num_cpus, export_backend):
+    """
+    Entry point of the training process. Progress and the final result are
+    sent back to the API process as dicts on the `events` queue.
+    """
+    try:
+        if num_cpus:
+            limit_cpu(num_cpus)
+
+        from backend.train import train_traffic_sign_model
+        history = train_traffic_sign_model(epochs=epochs, batch_size=batch_size, progress_callback=events.put)
+        if not history:
+            events.put({"type": "failed", "error": "Training failed, see server logs"})
+            return
+
+        if export_backend != 'keras':
+            from backend.export import export_model
+            export_model([export_backend])
+        events.put({"type": "completed", "history": history})
+    except Exception as e:
+        events.put({"type": "failed", "error": str(e)})
+
+
+class TrainingJob:
+    """
+    Runs train_traffic_sign_model in a separate process so training doesn't
+    compete with the API for the GIL. `on_event` is called from a monitor
+    thread for every progress event and once more with the final result.
+    """
+
+    def __init__(self, on_event, epochs=10, batch_size=64, num_cpus=None, export_backend='keras'):
+        self.on_event = on_event
+        self.epochs = epochs
+        self.batch_size = batch_size
+        self.num_cpus = num_cpus
+        self.export_backend = export_backend
+        self._ctx = mp.get_context('spawn')
+        self._events = None
+        self.process = None
+
+    def start(self):
+        self._events = self._ctx.Queue()
+        self.process = self._ctx.Process(
+            target=_run_training,
+            args=(self._events, self.epochs, self.batch_size, self.num_cpus, self.export_backend)
+        )
+        self.process.start()
+        threading.Thread(target=self._monitor, daemon=True).start()
+
+    def is_running(self):
+        return self.process is not None and self.process.is_alive()
+
+    def stop(self):
+        # Not a daemon process (dataset decoding spawns its own pool), so stop it explicitly
+        if self.is_running():
+            self.process.terminate()
+            self.process.join(timeout=5)
+
+    def _monitor(self):
+        while True:
+            try:
+                event = self._events.get(timeout=1)
+            except queue.Empty:
+                if self.process.is_alive():
+                    continue
+                self.on_event({"type": "failed", "error": f"Training process exited with code {self.process.exitcode}"})
+                return
+
+            finished = event["type"] in ("completed", "failed")
+            self.on_event(event)
+            if finished:
+                self.process.join()
+                return
@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+REGISTRY_DIR = os.path.join(os.getcwd(), 'models', 'registry')
+MODEL_FILENAME = 'traffic_sign_model.h5'
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Directory of immutable, versioned model artifacts:
+
+        models/registry/v1/traffic_sign_model.h5   (+ exported .tflite/.onnx)
+        models/registry/v1/metadata.json           checksums, creation time, notes
+        models/registry/state.json                 active version and activation history
+    """
+
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def model_path(self, version):
+        return os.path.join(self.root, version, MODEL_FILENAME)
+
+    def register(self, model_path, **metadata):
+        """
+        Copy a trained .h5 model and any exported artifacts next to it into a
+        new version directory. Returns the new version name.
+        """
+        stem = os.path.splitext(os.path.basename(model_path))[0]
+        source_dir = os.path.dirname(model_path)
+        trained_at = os.path.getmtime(model_path)
+        # Exports older than the .h5 belong to a previous model and are left out
+        artifacts = [
+            name for name in os.listdir(source_dir)
+            if name.startswith(stem) and name.endswith(('.h5', '.tflite', '.onnx')) and '.tmp' not in name
+            and os.path.getmtime(os.path.join(source_dir, name)) >= trained_at
+        ]
+
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            version = f"v{len(self._version_names()) + 1}"
+            while os.path.exists(os.path.join(self.root, version)):
+                version = f"v{int(version[1:]) + 1}"
+
+            # Build the version in a temp dir and rename it, so a partial copy is never visible
+            tmp_dir = os.path.join(self.root, f".{version}.tmp")
+            os.makedirs(tmp_dir, exist_ok=True)
+            checksums = {}
+            for name in artifacts:
+                target = MODEL_FILENAME.replace('.h5', '') + name[len(stem):]
+                shutil.copy2(os.path.join(source_dir, name), os.path.join(tmp_dir, target))
+                checksums[target] = sha256_file(os.path.join(tmp_dir, target))
+
+            info = dict(metadata, version=version, created_at=time.strftime('%Y-%m-%dT%H:%M:%S'), checksums=checksums)
+            with open(os.path.join(tmp_dir, 'metadata.json'), 'w') as f:
+                json.dump(info, f, indent=2)
+            os.rename(tmp_dir, os.path.join(self.root, version))
+        return version
+
+    def metadata(self, version):
+        with open(os.path.join(self.root, version, 'metadata.json')) as f:
+            return json.load(f)
+
+    def verify(self, version, artifact=MODEL_FILENAME):
+        """
+        Raise if an artifact is missing or its checksum no longer matches.
+        """
+        expected = self.metadata(version)['checksums'].get(artifact)
+        path = os.path.join(self.root, version, artifact)
+        if expected is None or not os.path.exists(path):
+            raise Exception(f"Model {version} has no artifact {artifact}")
+        if sha256_file(path) != expected:
+            raise Exception(f"Checksum mismatch for {version}/{artifact}")
+
+    def versions(self):
+        return [self.metadata(v) for v in self._version_names()]
+
+    def active_version(self):
+        return self._state().get('active')
+
+    def previous_version(self):
+        history = self._state().get('history', [])
+        return history[-2] if len(history) >= 2 else None
+
+    def set_active(self, version, rollback=False):
+        with self._lock:
+            state = self._state()
+            history = state.get('history', [])
+            if rollback and history and history[-1] == state.get('active'):
+                history.pop()
+            if not history or history[-1] != version:
+                history.append(version)
+            self._write_state({'active': version, 'history': history})
+
+    def _version_names(self):
+        if not os.path.isdir(self.root):
+            return []
+        names = [n for n in os.listdir(self.root) if n.startswith('v') and n[1:].isdigit()]
+        return sorted(names, key=lambda n: int(n[1:]))
+
+    def _state(self):
+        path = os.path.join(self.root, 'state.json')
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_state(self, state):
+        path = os.path.join(self.root, 'state.json')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, path)
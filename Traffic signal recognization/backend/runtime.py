@@ -0,0 +1,169 @@
+import os
+import threading
+
+import numpy as np
+
+# Artifact suffix for each runtime backend, relative to the .h5 model path
+BACKEND_SUFFIXES = {
+    'keras': '.h5',
+    'tflite': '.tflite',
+    'tflite_int8': '_int8.tflite',
+    'onnx': '.onnx',
+}
+
+# Batch sizes a TFLite runtime serves until told otherwise (see TFLiteRuntime)
+DEFAULT_BATCH_SIZES = (1, 32, 256)
+
+
+def runtime_model_path(model_path, backend='keras'):
+    """
+    Path of the artifact a backend serves, e.g. models/traffic_sign_model_int8.tflite.
+    """
+    if backend not in BACKEND_SUFFIXES:
+        raise ValueError(f"Unknown model backend '{backend}'. Choose one of: {', '.join(BACKEND_SUFFIXES)}")
+    return os.path.splitext(model_path)[0] + BACKEND_SUFFIXES[backend]
+
+
+class KerasRuntime:
+    def __init__(self, path, num_threads=None):
+        import tensorflow as tf
+        if num_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+        self.model = tf.keras.models.load_model(path)
+
+    def predict(self, batch):
+        return self.model(np.asarray(batch, dtype=np.float32), training=False).numpy()
+
+
+class TFLiteRuntime:
+    """
+    Runs a .tflite model with the lightest interpreter available. Quantized
+    inputs/outputs are converted so callers always see float probabilities.
+
+    Resizing an interpreter's input re-allocates all its tensors, so the
+    runtime only serves a few fixed batch sizes, each with its own
+    interpreter. A batch is zero-padded up to the smallest size that holds
+    it (or split by the largest) and the padding is sliced off the output.
+    """
+
+    def __init__(self, path, num_threads=None, batch_sizes=DEFAULT_BATCH_SIZES):
+        self.path = path
+        self.num_threads = num_threads
+        self._interpreters = {}  # batch size -> _SizedInterpreter
+        self._lock = threading.Lock()
+        # Builds the interpreter for the model's own input shape, and fails early on a bad file
+        default = _SizedInterpreter(path, num_threads=num_threads)
+        self._interpreters[default.batch_size] = default
+        self.set_batch_sizes(batch_sizes)
+
+    def set_batch_sizes(self, sizes):
+        """
+        Serve only these batch sizes; interpreters for other sizes are dropped.
+        """
+        with self._lock:
+            self.batch_sizes = sorted(set(sizes))
+            for size in list(self._interpreters):
+                if size not in self.batch_sizes:
+                    del self._interpreters[size]
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        sizes = self.batch_sizes
+        outputs = []
+        for start in range(0, len(batch), sizes[-1]):
+            chunk = batch[start:start + sizes[-1]]
+            count = len(chunk)
+            size = next(size for size in sizes if size >= count)
+            if size > count:
+                padding = np.zeros((size - count,) + chunk.shape[1:], dtype=np.float32)
+                chunk = np.concatenate([chunk, padding])
+            outputs.append(self._interpreter(size, chunk.shape).predict(chunk)[:count])
+        return np.concatenate(outputs) if len(outputs) != 1 else outputs[0]
+
+    def _interpreter(self, size, shape):
+        with self._lock:
+            interpreter = self._interpreters.get(size)
+        if interpreter is None:
+            interpreter = _SizedInterpreter(self.path, shape, self.num_threads)
+            with self._lock:
+                interpreter = self._interpreters.setdefault(size, interpreter)
+        return interpreter
+
+
+class _SizedInterpreter:
+    def __init__(self, path, shape=None, num_threads=None):
+        self.interpreter = _tflite_interpreter(path, num_threads)
+        if shape is not None:
+            self.interpreter.resize_tensor_input(self.interpreter.get_input_details()[0]['index'], shape)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = int(self.input['shape'][0])
+        # A single interpreter instance is not safe to invoke from several threads
+        self._lock = threading.Lock()
+
+    def predict(self, batch):
+        with self._lock:
+            self.interpreter.set_tensor(self.input['index'], _quantize(batch, self.input))
+            self.interpreter.invoke()
+            return _dequantize(self.interpreter.get_tensor(self.output['index']), self.output)
+
+
+class ONNXRuntime:
+    def __init__(self, path, num_threads=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+RUNTIMES = {
+    'keras': KerasRuntime,
+    'tflite': TFLiteRuntime,
+    'tflite_int8': TFLiteRuntime,
+    'onnx': ONNXRuntime,
+}
+
+
+def load_runtime(model_path, backend='keras', num_threads=None):
+    """
+    Load the artifact for `backend` next to the .h5 `model_path`.
+    Every runtime exposes predict(batch) -> (N, num_classes) probabilities.
+    `num_threads` caps the runtime's intra-op threads; None keeps its default.
+    """
+    return RUNTIMES[backend](runtime_model_path(model_path, backend), num_threads=num_threads)
+
+
+def _tflite_interpreter(path, num_threads=None):
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=path, num_threads=num_threads)
+
+
+def _quantize(batch, details):
+    if details['dtype'] == np.float32:
+        return batch
+    scale, zero_point = details['quantization']
+    info = np.iinfo(details['dtype'])
+    return np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(details['dtype'])
+
+
+def _dequantize(output, details):
+    if details['dtype'] == np.float32:
+        return output
+    scale, zero_point = details['quantization']
+    return (output.astype(np.float32) - zero_point) * scale
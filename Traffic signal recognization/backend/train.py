@@ -1,28 +1,34 @@
 import os
+import time
 import zipfile
 import requests
 import numpy as np
-import pandas as pd
 import tensorflow as tf
 from tensorflow.keras import layers, models
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
-from sklearn.model_selection import train_test_split
-import cv2
-from backend.utils import CLASSES
+from backend.dataset import (
+    load_cached_dataset, find_image_root, list_dataset, decode_dataset, split_indices, DATA_DIR, TRAINING_ZIP
+)
 
-DATA_DIR = os.path.join(os.getcwd(), 'data', 'gtsrb')
 MODEL_PATH = os.path.join(os.getcwd(), 'models', 'traffic_sign_model.h5')
 
 def download_dataset():
     """
-    Downloads GTSRB dataset if not present.
+    Downloads the GTSRB training zip if not present. It is not extracted:
+    load_data reads the images straight out of the archive.
     """
     
     url = "https://sid.erda.dk/public/archives/daaeac0d7ce1152aea9b61d9f1e19370/GTSRB_Final_Training_Images.zip"
-    zip_path = os.path.join(DATA_DIR, "GTSRB_Final_Training_Images.zip")
+    zip_path = os.path.join(DATA_DIR, TRAINING_ZIP)
     
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR, exist_ok=True)
+
+    if not os.path.exists(zip_path):
+        try:
+            find_image_root(DATA_DIR)
+            return # Already extracted by an earlier version, nothing to download
+        except Exception:
+            pass
         
     if not os.path.exists(zip_path) or os.path.getsize(zip_path) < 1000000:
         print("Downloading GTSRB dataset (~260MB)... this will take a moment.")
@@ -41,16 +47,14 @@ def download_dataset():
             print(f"And place it in: {zip_path}")
             return
 
-    if not os.path.exists(os.path.join(DATA_DIR, 'GTSRB')):
-        print("Extracting dataset... please wait.")
-        try:
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(DATA_DIR)
-            print("Extraction complete.")
-        except zipfile.BadZipFile:
-            print("Error: The downloaded file is corrupt. Deleting it for a retry.")
-            if os.path.exists(zip_path):
-                os.remove(zip_path)
+    try:
+        # Only reads the central directory
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            zip_ref.namelist()
+    except zipfile.BadZipFile:
+        print("Error: The downloaded file is corrupt. Deleting it for a retry.")
+        if os.path.exists(zip_path):
+            os.remove(zip_path)
 
 def build_model(input_shape=(32, 32, 3), num_classes=43):
     from tensorflow.keras.models import Sequential
@@ -82,78 +86,148 @@ def build_model(input_shape=(32, 32, 3), num_classes=43):
                   metrics=['accuracy'])
     return model
 
-def load_data(data_dir, target_size=(32, 32)):
-    images = []
-    labels = []
-    
-    
-    base_path = os.path.join(data_dir, 'GTSRB', 'Final_Training', 'Images')
-    if not os.path.exists(base_path):
-        base_path = os.path.join(data_dir, 'Final_Training', 'Images')
-
-    if not os.path.exists(base_path):
-       
-        for root, dirs, files in os.walk(data_dir):
-            if '00000' in dirs:
-                base_path = root
-                break
-
-    if not os.path.exists(base_path):
-        raise Exception(f"Dataset path not found inside {data_dir}. Please ensure it extracted correctly.")
-
-    print(f"Loading data from: {base_path}")
-    for class_id in range(43):
-        class_folder = format(class_id, '05d')
-        class_path = os.path.join(base_path, class_folder)
-        if not os.path.exists(class_path):
-            continue
-            
-        count = 0
-        img_names = os.listdir(class_path)
-        
-        for img_name in img_names:
-            if img_name.lower().endswith(('.ppm', '.jpg', '.png')):
-                img = cv2.imread(os.path.join(class_path, img_name))
-                if img is None: continue
-                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                img = cv2.resize(img, target_size)
-                images.append(img)
-                labels.append(class_id)
-                count += 1
-                if count >= 300: break
-                
-    return np.array(images), np.array(labels)
-
-def train_traffic_sign_model(epochs=10, batch_size=64):
+def load_data(data_dir, target_size=(32, 32), max_per_class=None, use_cache=True):
+    """
+    Returns (images, labels) with images as uint8 RGB arrays of `target_size`.
+    With `use_cache` the decoded tensors are kept in a memory-mapped file under
+    data/cache and reused while the source files and settings are unchanged.
+    """
+    if use_cache:
+        return load_cached_dataset(data_dir, target_size, max_per_class)
+
+    source, files = list_dataset(data_dir, max_per_class)
+    print(f"Loading data from: {source}")
+    results = decode_dataset(source, files, target_size)
+    return np.concatenate([images for images, _ in results]), np.concatenate([labels for _, labels in results])
+
+def build_augmenter():
+    return models.Sequential([
+        layers.RandomRotation(10 / 360),
+        layers.RandomZoom(0.1),
+        layers.RandomTranslation(0.1, 0.1),
+    ])
+
+def make_dataset(images, labels, indices, batch_size=64, training=False, augmenter=None):
+    """
+    Streams batches from the uint8 (optionally memory-mapped) image array, so only
+    a few batches are ever held in memory. Images are normalized to float32 on the
+    fly and, for training, shuffled and augmented in parallel.
+    """
+    autotune = tf.data.AUTOTUNE
+    image_shape = images.shape[1:]
+
+    def gather(batch_indices):
+        # Sorted reads keep memory-mapped access mostly sequential
+        batch_indices = np.sort(batch_indices)
+        return images[batch_indices], labels[batch_indices].astype(np.int64)
+
+    def load_batch(batch_indices):
+        x, y = tf.numpy_function(gather, [batch_indices], (tf.uint8, tf.int64))
+        x.set_shape((None,) + tuple(image_shape))
+        y.set_shape((None,))
+        return tf.cast(x, tf.float32) / 255.0, y
+
+    ds = tf.data.Dataset.from_tensor_slices(np.asarray(indices))
+    if training:
+        ds = ds.shuffle(len(indices), reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size).map(load_batch, num_parallel_calls=autotune)
+    if training and augmenter is not None:
+        ds = ds.map(lambda x, y: (augmenter(x, training=True), y), num_parallel_calls=autotune)
+    return ds.prefetch(autotune)
+
+class ProgressCallback(tf.keras.callbacks.Callback):
+    """
+    Reports per-batch and per-epoch progress (loss, accuracy, ETA) as dicts
+    to `report`. Batch events are throttled to one every `min_interval` seconds.
+    """
+
+    def __init__(self, report, epochs, min_interval=0.5):
+        super().__init__()
+        self.report = report
+        self.epochs = epochs
+        self.min_interval = min_interval
+        self.steps = None
+        self.start_time = None
+        self.last_report = 0.0
+        self.epoch = 0
+
+    def on_train_begin(self, logs=None):
+        self.start_time = time.time()
+        self.steps = self.params.get('steps')
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch = epoch
+
+    def _progress(self, epoch, batch):
+        if self.steps:
+            return (epoch + batch / self.steps) / self.epochs
+        return epoch / self.epochs
+
+    def _event(self, event_type, progress, logs):
+        elapsed = time.time() - self.start_time
+        return {
+            "type": event_type,
+            "epoch": self.epoch + 1,
+            "epochs": self.epochs,
+            "progress": round(progress * 100, 1),
+            "loss": float(logs.get("loss", 0.0)),
+            "accuracy": float(logs.get("accuracy", 0.0)),
+            "eta_seconds": round(elapsed / progress - elapsed, 1) if progress > 0 else None,
+        }
+
+    def on_train_batch_end(self, batch, logs=None):
+        now = time.time()
+        if now - self.last_report < self.min_interval:
+            return
+        self.last_report = now
+        event = self._event("batch", self._progress(self.epoch, batch + 1), logs or {})
+        event.update({"batch": batch + 1, "steps": self.steps})
+        self.report(event)
+
+    def on_epoch_end(self, epoch, logs=None):
+        logs = logs or {}
+        event = self._event("epoch", (epoch + 1) / self.epochs, logs)
+        event.update({
+            "val_loss": float(logs.get("val_loss", 0.0)),
+            "val_accuracy": float(logs.get("val_accuracy", 0.0)),
+        })
+        self.report(event)
+
+def train_traffic_sign_model(epochs=10, batch_size=64, progress_callback=None):
+    """
+    Train on GTSRB and save to MODEL_PATH. `progress_callback`, if given, is
+    called with a dict after every epoch and periodically during an epoch.
+    """
     try:
         download_dataset()
         X, y = load_data(DATA_DIR)
         if len(X) == 0:
             raise Exception("No images found in dataset!")
-            
-        X = X / 255.0
-        X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        datagen = ImageDataGenerator(
-            rotation_range=10,
-            zoom_range=0.1,
-            width_shift_range=0.1,
-            height_shift_range=0.1,
-            shear_range=0.1
-        )
-        
+
+        train_idx, val_idx = split_indices(len(y))
+        train_ds = make_dataset(X, y, train_idx, batch_size, training=True, augmenter=build_augmenter())
+        val_ds = make_dataset(X, y, val_idx, batch_size)
+
+        callbacks = []
+        if progress_callback is not None:
+            callbacks.append(ProgressCallback(progress_callback, epochs))
+
         model = build_model()
         history = model.fit(
-            datagen.flow(X_train, y_train, batch_size=batch_size),
+            train_ds,
             epochs=epochs,
-            validation_data=(X_val, y_val),
+            validation_data=val_ds,
+            callbacks=callbacks,
             verbose=1
         )
         
         if not os.path.exists(os.path.dirname(MODEL_PATH)):
             os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
-            
-        model.save(MODEL_PATH)
+
+        # Save next to the old model and rename, so readers never see a partial file
+        tmp_path = os.path.splitext(MODEL_PATH)[0] + '.tmp.h5'
+        model.save(tmp_path)
+        os.replace(tmp_path, MODEL_PATH)
         return history.history
     except Exception as e:
         print(f"Error: {e}")
@@ -1,6 +1,12 @@
 import cv2
 import numpy as np
 import os
+import io
+import tarfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+IMAGE_EXTENSIONS = ('.ppm', '.jpg', '.jpeg', '.png', '.bmp')
 
 
 CLASSES = {
@@ -49,24 +55,140 @@ CLASSES = {
     42: 'End of no passing by vehicles over 3.5 metric tons'
 }
 
-def preprocess_image(image_path_or_bytes, target_size=(32, 32)):
+# libjpeg can decode straight to 1/2, 1/4 or 1/8 resolution, largest reduction first
+REDUCED_JPEG_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+# A reduced decode must still leave at least this many pixels per output pixel, per side
+MIN_REDUCED_SCALE = 4
+
+def jpeg_size(data):
     """
-    Load and preprocess image for model prediction.
+    (width, height) read from a JPEG's start-of-frame marker, or None.
+    """
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        # SOF0..SOF15, except DHT (C4), JPG (C8) and DAC (CC) which share the range
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            return int.from_bytes(data[i + 7:i + 9], 'big'), int.from_bytes(data[i + 5:i + 7], 'big')
+        i += 2 + int.from_bytes(data[i + 2:i + 4], 'big')
+    return None
+
+def decode_image(image_path_or_bytes, target_size=(32, 32)):
+    """
+    Decode to a BGR uint8 array, or None. JPEGs much larger than `target_size`
+    are decoded at reduced resolution, which skips most of the decoding work.
     """
     if isinstance(image_path_or_bytes, str):
-        img = cv2.imread(image_path_or_bytes)
-    else:
-        nparr = np.frombuffer(image_path_or_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    
-    if img is None:
+        try:
+            with open(image_path_or_bytes, 'rb') as f:
+                image_path_or_bytes = f.read()
+        except OSError:
+            return None
+    if not image_path_or_bytes:
         return None
-        
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+    flags = cv2.IMREAD_COLOR
+    size = jpeg_size(image_path_or_bytes) if image_path_or_bytes[:2] == b'\xff\xd8' else None
+    if size is not None:
+        scale = min(size[0] / target_size[0], size[1] / target_size[1])
+        for factor, reduced in REDUCED_JPEG_FLAGS:
+            if scale >= factor * MIN_REDUCED_SCALE:
+                flags = reduced
+                break
+
+    try:
+        return cv2.imdecode(np.frombuffer(image_path_or_bytes, np.uint8), flags)
+    except cv2.error:
+        return None
+
+def preprocess_into(image_path_or_bytes, out, target_size=(32, 32)):
+    """
+    Decode an image and write it, RGB and scaled to [0, 1], into the float32
+    array `out` of shape (H, W, 3). Returns False if it can't be decoded.
+    """
+    img = decode_image(image_path_or_bytes, target_size)
+    if img is None:
+        return False
+    # Resizing first means only H*W pixels are colour-converted and normalized,
+    # and the BGR->RGB swap and division write straight into `out`
     img = cv2.resize(img, target_size)
-    img = img / 255.0  
-    img = np.expand_dims(img, axis=0) 
-    return img
+    np.divide(img[..., ::-1], np.float32(255.0), out=out, casting='unsafe')
+    return True
+
+def preprocess_image(image_path_or_bytes, target_size=(32, 32)):
+    """
+    Load and preprocess image for model prediction.
+    """
+    batch = np.empty((1, target_size[1], target_size[0], 3), dtype=np.float32)
+    if not preprocess_into(image_path_or_bytes, batch[0], target_size):
+        return None
+    return batch
+
+def preprocess_batch(images, target_size=(32, 32), max_workers=None):
+    """
+    Decode and preprocess many images in parallel into one float32 batch.
+    Returns (batch, valid), where `valid` marks the images that decoded.
+    """
+    batch = np.empty((len(images), target_size[1], target_size[0], 3), dtype=np.float32)
+
+    def preprocess(i):
+        # One unreadable image only marks its own slot invalid
+        try:
+            return preprocess_into(images[i], batch[i], target_size)
+        except Exception:
+            return False
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        valid = list(executor.map(preprocess, range(len(images))))
+    return batch, np.array(valid, dtype=bool)
+
+class ArchiveLimitError(Exception):
+    pass
+
+def _check_limits(count, total_bytes, max_members, max_bytes):
+    if max_members is not None and count > max_members:
+        raise ArchiveLimitError(f"Archive has more than {max_members} images")
+    if max_bytes is not None and total_bytes > max_bytes:
+        raise ArchiveLimitError(f"Archive images exceed {max_bytes} bytes uncompressed")
+
+def extract_archive(data, max_members=None, max_bytes=None):
+    """
+    Return [(name, bytes), ...] for the image members of a zip or tar archive,
+    in archive order, or None if `data` is not an archive. Raises
+    ArchiveLimitError, before inflating anything, if the image members are
+    more than `max_members` or larger than `max_bytes` uncompressed.
+    """
+    buffer = io.BytesIO(data)
+    if zipfile.is_zipfile(buffer):
+        with zipfile.ZipFile(buffer) as zf:
+            members = [
+                info for info in zf.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+            ]
+            # zipfile never returns more than a member's declared file_size
+            _check_limits(len(members), sum(info.file_size for info in members), max_members, max_bytes)
+            return [(info.filename, zf.read(info)) for info in members]
+
+    buffer.seek(0)
+    try:
+        with tarfile.open(fileobj=buffer, mode='r:*') as archive:
+            members = [
+                member for member in archive.getmembers()
+                if member.isfile() and member.name.lower().endswith(IMAGE_EXTENSIONS)
+            ]
+            _check_limits(len(members), sum(member.size for member in members), max_members, max_bytes)
+            return [(member.name, archive.extractfile(member).read()) for member in members]
+    except tarfile.TarError:
+        return None
 
 def get_class_name(class_id):
     return CLASSES.get(class_id, "Unknown")
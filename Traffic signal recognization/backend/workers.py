@@ -0,0 +1,288 @@
+import os
+import threading
+import multiprocessing as mp
+from collections import deque
+
+import numpy as np
+
+from backend.jobs import limit_threads
+
+INPUT_SHAPE = (32, 32, 3)
+
+
+class WorkerError(Exception):
+    pass
+
+
+def _worker_main(model_path, backend, conn, num_threads):
+    """
+    Entry point of a replica process: load the model once, then serve
+    predict/ping messages over the pipe until told to stop.
+    """
+    # Before the runtime is imported, so its thread pools only get this replica's share
+    limit_threads(num_threads)
+    from backend.runtime import load_runtime
+
+    try:
+        model = load_runtime(model_path, backend, num_threads=num_threads)
+        model.predict(np.zeros((1,) + INPUT_SHAPE, dtype=np.float32))
+    except Exception as e:
+        conn.send(("error", f"Error loading model: {e}"))
+        return
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            command, payload = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+
+        if command == "predict":
+            try:
+                conn.send(("ok", model.predict(payload)))
+            except Exception as e:
+                conn.send(("error", str(e)))
+        elif command == "ping":
+            conn.send(("pong", None))
+        elif command == "stop":
+            break
+
+
+class _Worker:
+    def __init__(self, ctx, index, model_path, backend, num_threads, restarts=0):
+        self.index = index
+        self.restarts = restarts
+        self.served = 0
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(model_path, backend, child_conn, num_threads), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def wait_ready(self, timeout):
+        status, payload = self._receive(timeout)
+        if status != "ready":
+            raise WorkerError(payload)
+
+    def call(self, command, payload=None, timeout=30):
+        try:
+            self.conn.send((command, payload))
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerError(f"Worker {self.index} is not reachable: {e}")
+        status, result = self._receive(timeout)
+        if status == "error":
+            # The replica is healthy, the request itself failed
+            raise RuntimeError(result)
+        return result
+
+    def _receive(self, timeout):
+        try:
+            if not self.conn.poll(timeout):
+                raise WorkerError(f"Worker {self.index} timed out")
+            return self.conn.recv()
+        except (EOFError, OSError) as e:
+            raise WorkerError(f"Worker {self.index} died: {e}")
+
+    def terminate(self):
+        if self.process.is_alive():
+            try:
+                self.conn.send(("stop", None))
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join(timeout=2)
+        self.conn.close()
+
+    def info(self):
+        return {
+            "worker": self.index,
+            "pid": self.process.pid,
+            "alive": self.is_alive(),
+            "restarts": self.restarts,
+            "served": self.served,
+        }
+
+
+class ModelWorkerPool:
+    """
+    Runs N model replicas in separate processes and hands each batch to
+    whichever replica is idle. Crashed or unresponsive replicas are restarted,
+    both when a request hits them and by a periodic health check; a replica
+    that fails to come back is left out of rotation until a later check
+    restarts it.
+    """
+
+    def __init__(self, model_path, num_workers=None, backend='keras', request_timeout=30,
+                 startup_timeout=120, health_interval=10):
+        self.model_path = model_path
+        self.backend = backend
+        self.num_workers = num_workers or os.cpu_count() or 1
+        # Split the cores between replicas instead of letting each one use all of them
+        self.num_threads = max(1, (os.cpu_count() or 1) // self.num_workers)
+        self.request_timeout = request_timeout
+        self.startup_timeout = startup_timeout
+        self.health_interval = health_interval
+        self._ctx = mp.get_context("spawn")
+        self._idle = deque()
+        self._idle_changed = threading.Condition()
+        self._workers = {}
+        self._failed = set()  # indices whose replica failed to start
+        self._stopped = threading.Event()
+        self._health_thread = None
+
+    def start(self):
+        # Spawn all replicas first so they load the model in parallel
+        workers = []
+        try:
+            for i in range(self.num_workers):
+                workers.append(_Worker(self._ctx, i, self.model_path, self.backend, self.num_threads))
+            for worker in workers:
+                worker.wait_ready(self.startup_timeout)
+                self._workers[worker.index] = worker
+                self._release(worker)
+        except BaseException:
+            # Don't leak the replicas that were spawned but never put in rotation
+            for worker in workers:
+                worker.terminate()
+            with self._idle_changed:
+                self._idle.clear()
+            self._workers.clear()
+            raise
+
+        self._stopped.clear()
+        self._health_thread = threading.Thread(target=self._health_loop, daemon=True)
+        self._health_thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        for worker in list(self._workers.values()):
+            worker.terminate()
+        self._workers.clear()
+
+    def predict(self, batch):
+        worker = self._acquire(self.request_timeout)
+        if worker is None:
+            raise WorkerError("No inference worker available")
+
+        if not worker.is_alive():
+            worker = self._restart(worker)
+            if worker is None:
+                raise WorkerError("Inference worker could not be restarted")
+        try:
+            preds = worker.call("predict", batch, timeout=self.request_timeout)
+        except WorkerError:
+            # A dead or timed-out replica can't be trusted to be in sync with its pipe
+            self._replace(worker)
+            raise
+        except BaseException:
+            self._release(worker)
+            raise
+        worker.served += 1
+        self._release(worker)
+        return preds
+
+    def reload(self, model_path=None):
+        """
+        Restart every replica on a (possibly new) model file, one at a time,
+        so the remaining replicas keep serving during the reload.
+        """
+        if model_path is not None:
+            self.model_path = model_path
+        for index in sorted(self._workers):
+            # Wait for this particular replica to finish its request (or to be marked failed)
+            self._replace(self._claim(index, None))
+
+    def health(self):
+        workers = [self._workers[i].info() for i in sorted(self._workers)]
+        return {
+            "workers": workers,
+            "alive": sum(w["alive"] for w in workers),
+            "idle": len(self._idle),
+            "failed": sorted(self._failed),
+        }
+
+    def _acquire(self, timeout):
+        """
+        Take any idle replica out of rotation, or None on timeout.
+        """
+        with self._idle_changed:
+            if not self._idle_changed.wait_for(lambda: self._idle, timeout):
+                return None
+            return self._idle.popleft()
+
+    def _claim(self, index, timeout):
+        """
+        Take replica `index` out of rotation once it is idle or marked failed,
+        so it can be restarted. Returns None on timeout.
+        """
+        def available():
+            return index in self._failed or any(w.index == index for w in self._idle)
+
+        with self._idle_changed:
+            if not self._idle_changed.wait_for(available, timeout):
+                return None
+            if index in self._failed:
+                self._failed.discard(index)
+            else:
+                self._idle.remove(self._workers[index])
+            return self._workers[index]
+
+    def _release(self, worker):
+        with self._idle_changed:
+            self._idle.append(worker)
+            self._idle_changed.notify_all()
+
+    def _restart(self, worker):
+        """
+        Replace a replica taken out of rotation by a new process. Returns the
+        new replica, or None if it did not become ready; that slot is then
+        marked failed rather than handed to requests.
+        """
+        worker.terminate()
+        print(f"Restarting inference worker {worker.index}...")
+        new_worker = _Worker(
+            self._ctx, worker.index, self.model_path, self.backend, self.num_threads, worker.restarts + 1
+        )
+        self._workers[worker.index] = new_worker
+        try:
+            new_worker.wait_ready(self.startup_timeout)
+        except WorkerError as e:
+            print(f"Inference worker {worker.index} failed to start: {e}")
+            new_worker.terminate()
+            with self._idle_changed:
+                self._failed.add(worker.index)
+                self._idle_changed.notify_all()
+            return None
+        return new_worker
+
+    def _replace(self, worker):
+        new_worker = self._restart(worker)
+        if new_worker is not None:
+            self._release(new_worker)
+
+    def _health_loop(self):
+        while not self._stopped.wait(self.health_interval):
+            # Only idle replicas are pinged; busy ones are checked when their request returns
+            for _ in range(len(self._idle)):
+                worker = self._acquire(0)
+                if worker is None:
+                    break
+                try:
+                    worker.call("ping", timeout=5)
+                except (WorkerError, RuntimeError):
+                    self._replace(worker)
+                else:
+                    self._release(worker)
+
+            for index in sorted(self._failed):
+                if self._stopped.is_set():
+                    break
+                worker = self._claim(index, 0)
+                if worker is not None:
+                    self._replace(worker)
@@ -0,0 +1,342 @@
+"""
+Latency and throughput benchmark for the traffic sign API.
+
+    python benchmark.py                                  # in-process, against backend.app
+    python benchmark.py --url http://127.0.0.1:8000      # against a running uvicorn
+    python benchmark.py --compare benchmark_results.json # print the change against an earlier run
+
+Uses images from --images if given, otherwise synthetic sign-like images, and a
+randomly initialised build_model() when no trained model is registered.
+"""
+import os
+import sys
+import json
+import time
+import base64
+import asyncio
+import argparse
+import itertools
+import tempfile
+import subprocess
+
+import cv2
+import numpy as np
+import httpx
+
+from backend.utils import preprocess_image, IMAGE_EXTENSIONS
+from backend.runtime import load_runtime, runtime_model_path
+from backend.registry import ModelRegistry
+
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "keras")
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", 32))
+INPUT_SIZE = (32, 32)
+
+# (width, height) of the synthetic images: a GTSRB-sized crop, a webcam frame and a phone photo
+SYNTHETIC_SIZES = {
+    'crop': (48, 48),
+    'frame': (640, 480),
+    'photo': (4032, 3024),
+}
+
+
+def synthetic_image(width, height, seed=0):
+    """
+    A red-ringed white disc on a noisy background, JPEG-encoded.
+    """
+    rng = np.random.default_rng(seed)
+    img = rng.integers(60, 200, size=(height, width, 3), dtype=np.uint8)
+    center, radius = (width // 2, height // 2), min(width, height) // 3
+    cv2.circle(img, center, radius, (40, 40, 220), thickness=-1)
+    cv2.circle(img, center, int(radius * 0.75), (255, 255, 255), thickness=-1)
+    ok, encoded = cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return encoded.tobytes()
+
+
+def load_images(image_dir=None):
+    """
+    Returns {name: encoded bytes}, from `image_dir` if given, else synthetic.
+    """
+    if image_dir:
+        images = {}
+        for name in sorted(os.listdir(image_dir)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                with open(os.path.join(image_dir, name), 'rb') as f:
+                    images[name] = f.read()
+        if not images:
+            raise SystemExit(f"No images found in {image_dir}")
+        return images
+    return {name: synthetic_image(w, h, seed=i) for i, (name, (w, h)) in enumerate(SYNTHETIC_SIZES.items())}
+
+
+def random_runtime():
+    """
+    A tiny untrained model, so the benchmark runs on a fresh checkout.
+    """
+    from backend.train import build_model
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'random_model.h5')
+        build_model().save(path)
+        return load_runtime(path, 'keras')
+
+
+def local_runtime():
+    """
+    The active registry version if there is one, else a random model.
+    Returns (runtime, description).
+    """
+    registry = ModelRegistry()
+    version = registry.active_version()
+    if version is not None and os.path.exists(runtime_model_path(registry.model_path(version), MODEL_BACKEND)):
+        return load_runtime(registry.model_path(version), MODEL_BACKEND), f"registry {version} ({MODEL_BACKEND})"
+    print("No trained model found, benchmarking a randomly initialised model.")
+    return random_runtime(), "random (keras)"
+
+
+def summarize(latencies_ms):
+    values = np.asarray(latencies_ms)
+    if len(values) == 0:
+        return {}
+    return {
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+    }
+
+
+def timed(fn, repeats):
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return summarize(latencies)
+
+
+def stage_breakdown(images, runtime, repeats):
+    """
+    Per-image cost of decode, colour conversion + resize + normalization,
+    the full preprocess_image call and the forward pass.
+    """
+    stages = {}
+    for name, data in images.items():
+        buffer = np.frombuffer(data, np.uint8)
+        decoded = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+        if decoded is None:
+            print(f"Skipping {name}: could not decode")
+            continue
+
+        def resize():
+            img = cv2.cvtColor(decoded, cv2.COLOR_BGR2RGB)
+            return cv2.resize(img, INPUT_SIZE) / 255.0
+
+        stages[name] = {
+            "width": int(decoded.shape[1]),
+            "height": int(decoded.shape[0]),
+            "bytes": len(data),
+            "decode": timed(lambda: cv2.imdecode(buffer, cv2.IMREAD_COLOR), repeats),
+            "resize": timed(resize, repeats),
+            "preprocess_image": timed(lambda: preprocess_image(data), repeats),
+        }
+
+    runtime.predict(np.zeros((BATCH_MAX_SIZE,) + INPUT_SIZE + (3,), dtype=np.float32))
+    forward = {}
+    for size in sorted({1, BATCH_MAX_SIZE}):
+        batch = np.random.default_rng(0).random((size,) + INPUT_SIZE + (3,), dtype=np.float32)
+        forward[f"batch_{size}"] = timed(lambda: runtime.predict(batch), repeats)
+        forward[f"batch_{size}"]["per_image_ms"] = round(forward[f"batch_{size}"]["mean_ms"] / size, 3)
+    return {"images": stages, "forward": forward}
+
+
+_request_ids = itertools.count()
+
+
+def unique_payload(data):
+    # Decoders stop at the end-of-image marker, so trailing bytes change the
+    # content hash (and miss the prediction cache) without changing the image
+    return data + next(_request_ids).to_bytes(8, 'little')
+
+
+async def send(client, endpoint, data):
+    if endpoint == '/predict':
+        return await client.post('/predict', files={'file': ('image.jpg', data, 'image/jpeg')})
+    encoded = base64.b64encode(data).decode()
+    return await client.post('/predict_base64', json={'image': f"data:image/jpeg;base64,{encoded}"})
+
+
+async def run_load(client, endpoint, data, concurrency, num_requests):
+    """
+    `concurrency` clients send `num_requests` requests in total, each as soon
+    as its previous one completes.
+    """
+    latencies, errors = [], 0
+    next_request = iter(range(num_requests))
+
+    async def client_loop():
+        nonlocal errors
+        for _ in next_request:
+            payload = unique_payload(data)
+            start = time.perf_counter()
+            try:
+                response = await send(client, endpoint, payload)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client_loop() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": num_requests,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else None,
+        **summarize(latencies),
+    }
+
+
+async def load_test(client, images, endpoints, concurrency_levels, num_requests):
+    results = []
+    for name, data in images.items():
+        for endpoint in endpoints:
+            # Warm-up so the first level doesn't pay for batcher startup
+            await run_load(client, endpoint, data, 1, 3)
+            for concurrency in concurrency_levels:
+                result = dict(image=name, **await run_load(client, endpoint, data, concurrency, num_requests))
+                print(f"{endpoint:16} {name:10} c={concurrency:<4} {result['throughput_rps']:>8} req/s  "
+                      f"p50 {result.get('p50_ms')} ms  p95 {result.get('p95_ms')} ms  "
+                      f"p99 {result.get('p99_ms')} ms  errors {result['errors']}")
+                results.append(result)
+    return results
+
+
+async def run_in_process(images, args):
+    """
+    Drive backend.app through httpx's ASGI transport, without a network hop.
+    """
+    import backend.app as api
+
+    api.on_startup()  # ASGITransport does not run startup events
+    description = f"registry {api.model_version} ({api.MODEL_BACKEND})"
+    if not api.model_ready():
+        api.model, description = random_runtime(), "random (keras)"
+        api.warm_up(api.model)
+
+    transport = httpx.ASGITransport(app=api.app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url='http://benchmark', timeout=120) as client:
+            load = await load_test(client, images, args.endpoints, args.concurrency, args.requests)
+        runtime = api.model if api.model is not None else local_runtime()[0]
+    finally:
+        await api.batcher.stop()
+        if api.worker_pool is not None:
+            api.worker_pool.stop()
+    return load, runtime, description
+
+
+async def run_remote(images, args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=120) as client:
+        return await load_test(client, images, args.endpoints, args.concurrency, args.requests)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current):
+    """
+    Print p95 latency and throughput changes for load runs present in both result files.
+    """
+    def runs(results):
+        return {(r['endpoint'], r['image'], r['concurrency']): r for r in results['load']}
+
+    print(f"\nChange since {previous.get('commit')} ({previous.get('timestamp')}):")
+    old_runs = runs(previous)
+    for key, new in runs(current).items():
+        old = old_runs.get(key)
+        if old is None or not old.get('p95_ms') or not new.get('p95_ms'):
+            continue
+        p95_change = (new['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100
+        # An earlier run with only errors has no throughput to compare against
+        if old.get('throughput_rps') and new.get('throughput_rps') is not None:
+            rps_change = f"{(new['throughput_rps'] - old['throughput_rps']) / old['throughput_rps'] * 100:+6.1f}%"
+        else:
+            rps_change = "   n/a"
+        print(f"{key[0]:16} {key[1]:10} c={key[2]:<4} p95 {p95_change:+6.1f}%  throughput {rps_change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the traffic sign recognition API.")
+    parser.add_argument('--url', help="benchmark a running server instead of the app in-process")
+    parser.add_argument('--images', help="folder of sample images (default: synthetic images)")
+    parser.add_argument('--endpoints', nargs='+', default=['/predict', '/predict_base64'],
+                        choices=['/predict', '/predict_base64'])
+    parser.add_argument('--load-images', nargs='+', default=['frame'], choices=list(SYNTHETIC_SIZES),
+                        help="synthetic images to use for the load test (default: frame)")
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 4, 16, 64])
+    parser.add_argument('--requests', type=int, default=200, help="requests per concurrency level")
+    parser.add_argument('--repeats', type=int, default=50, help="repetitions per stage measurement")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    images = load_images(args.images)
+    # Every image from --images is load-tested; of the synthetic ones only those selected
+    load_set = images if args.images else {name: images[name] for name in args.load_images}
+
+    if args.url:
+        load = asyncio.run(run_remote(load_set, args))
+        runtime, description = local_runtime()
+        mode = f"remote {args.url}"
+    else:
+        load, runtime, description = asyncio.run(run_in_process(load_set, args))
+        mode = "in-process"
+
+    print("Measuring per-stage costs...")
+    stages = stage_breakdown(images, runtime, args.repeats)
+    for name, stage in stages["images"].items():
+        print(f"{name:10} {stage['width']}x{stage['height']}  decode {stage['decode']['mean_ms']} ms  "
+              f"resize {stage['resize']['mean_ms']} ms  preprocess_image {stage['preprocess_image']['mean_ms']} ms")
+    for name, stage in stages["forward"].items():
+        print(f"forward {name:10} {stage['mean_ms']} ms ({stage['per_image_ms']} ms/image)")
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "mode": mode,
+        "model": description,
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "batch_max_size": BATCH_MAX_SIZE,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "repeats": args.repeats,
+        },
+        "load": load,
+        "stages": stages,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,8 @@
 const API_URL = 'http://127.0.0.1:8000';
+const WS_URL = API_URL.replace(/^http/, 'ws');
+// Webcam frames streamed per second, and their longest side in pixels (the model only needs 32x32)
+const STREAM_FPS = 10;
+const STREAM_FRAME_SIZE = 320;
 
 
 const imageUpload = document.getElementById('imageUpload');
@@ -20,6 +24,8 @@ const webcamBtnText = document.getElementById('webcamBtnText');
 
 let isWebcamActive = false;
 let webcamInterval = null;
+let webcamSocket = null;
+let nextFrameId = 0;
 
 
 imageUpload.addEventListener('change', async (e) => {
@@ -117,8 +123,8 @@ async function startWebcam() {
         uploadPlaceholder.classList.add('hidden');
         webcamContainer.classList.remove('hidden');
 
-        
-        webcamInterval = setInterval(captureWebcamFrame, 1000); // 1 frame per second
+
+        startWebcamStream();
     } catch (err) {
         console.error('Error accessing webcam:', err);
         alert('Could not access webcam. Please check permissions.');
@@ -132,10 +138,58 @@ function stopWebcam() {
     isWebcamActive = false;
     webcamBtnText.innerText = 'Start Webcam';
     clearInterval(webcamInterval);
+    if (webcamSocket) {
+        webcamSocket.close();
+    }
     webcamContainer.classList.add('hidden');
     uploadPlaceholder.classList.remove('hidden');
 }
 
+function startWebcamStream() {
+    webcamSocket = new WebSocket(`${WS_URL}/ws/stream`);
+
+    webcamSocket.onopen = () => {
+        webcamInterval = setInterval(sendWebcamFrame, 1000 / STREAM_FPS);
+    };
+
+    webcamSocket.onmessage = (event) => {
+        const data = JSON.parse(event.data);
+        if (data.class_name) {
+            displayResults(data);
+        }
+    };
+
+    webcamSocket.onclose = () => {
+        webcamSocket = null;
+        clearInterval(webcamInterval);
+        if (isWebcamActive) {
+            // Stream unavailable: fall back to one HTTP request per second
+            webcamInterval = setInterval(captureWebcamFrame, 1000);
+        }
+    };
+}
+
+function sendWebcamFrame() {
+    if (!isWebcamActive || !webcamSocket || webcamSocket.readyState !== WebSocket.OPEN) return;
+    // Skip this tick while the previous frame is still being sent, or before the video has started
+    if (webcamSocket.bufferedAmount > 0 || !webcamVideo.videoWidth) return;
+
+    const scale = Math.min(1, STREAM_FRAME_SIZE / Math.max(webcamVideo.videoWidth, webcamVideo.videoHeight));
+    webcamCanvas.width = Math.round(webcamVideo.videoWidth * scale);
+    webcamCanvas.height = Math.round(webcamVideo.videoHeight * scale);
+    webcamCanvas.getContext('2d').drawImage(webcamVideo, 0, 0, webcamCanvas.width, webcamCanvas.height);
+
+    const frameId = nextFrameId;
+    nextFrameId = (nextFrameId + 1) >>> 0;
+    webcamCanvas.toBlob((blob) => {
+        if (!blob || !webcamSocket || webcamSocket.readyState !== WebSocket.OPEN) return;
+        // Binary message: 4-byte big-endian frame id, then the JPEG
+        const header = new DataView(new ArrayBuffer(4));
+        header.setUint32(0, frameId);
+        webcamSocket.send(new Blob([header, blob]));
+    }, 'image/jpeg', 0.8);
+}
+
 async function captureWebcamFrame() {
     if (!isWebcamActive) return;
 
@@ -198,11 +252,13 @@ function pollTrainingStatus() {
                 alert('Training finished successfully!');
                 if (data.history) updateChart(data.history);
             } else if (data.status === 'training') {
-                
-                let p = parseInt(progress.innerText) || 0;
-                if (p < 95) p += 1;
+                const p = Math.round(data.progress || 0);
                 progress.innerText = `${p}%`;
                 progressFill.style.width = `${p}%`;
+                if (data.epoch) {
+                    const eta = data.eta_seconds != null ? `, ~${Math.ceil(data.eta_seconds)}s left` : '';
+                    label.innerText = `Status: Training (epoch ${data.epoch}/${data.epochs}${eta})`;
+                }
             } else if (data.status === 'failed') {
                 clearInterval(interval);
                 alert('Training failed: ' + (data.error || 'Unknown error'));
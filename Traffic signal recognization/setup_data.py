@@ -1,13 +1,14 @@
 from backend.train import download_dataset
+from backend.dataset import list_dataset, DATA_DIR
 import os
 
-print("Starting dataset download and extraction...")
+print("Starting dataset download...")
 download_dataset()
 print("Process completed.")
 
-base_path = os.path.join('data', 'gtsrb', 'GTSRB', 'Final_Training', 'Images')
-if os.path.exists(base_path):
-    print(f"Success! Folder found at: {os.path.abspath(base_path)}")
-    print(f"Number of class folders: {len(os.listdir(base_path))}")
-else:
-    print(f"Error: Folder still not found at {base_path}")
+try:
+    source, files = list_dataset(DATA_DIR)
+    print(f"Success! Dataset found at: {os.path.abspath(source)}")
+    print(f"Number of classes: {len({class_id for _, class_id in files})}, images: {len(files)}")
+except Exception as e:
+    print(f"Error: {e}")
@@ -1,18 +1,37 @@
 import cv2
 import numpy as np
-import tensorflow as tf
 import os
-from backend.utils import preprocess_image, get_class_name
+import time
+import queue
+import argparse
+import threading
+from backend.utils import get_class_name
+from backend.runtime import load_runtime, runtime_model_path
 
 MODEL_PATH = os.path.join('models', 'traffic_sign_model.h5')
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "keras")
+INPUT_SIZE = (32, 32)
+
+# HSV ranges for the red and blue found on most sign borders and backgrounds
+COLOR_RANGES = [
+    ((0, 90, 60), (10, 255, 255)),
+    ((165, 90, 60), (180, 255, 255)),
+    ((100, 120, 50), (130, 255, 255)),
+]
+
+def load_demo_model():
+    model_file = runtime_model_path(MODEL_PATH, MODEL_BACKEND)
+    if not os.path.exists(model_file):
+        print(f"Error: Model not found at {model_file}. Please train (and export) the model first.")
+        return None
+
+    print(f"Loading model ({MODEL_BACKEND})...")
+    return load_runtime(MODEL_PATH, MODEL_BACKEND)
 
 def run_webcam_demo():
-    if not os.path.exists(MODEL_PATH):
-        print(f"Error: Model not found at {MODEL_PATH}. Please train the model first.")
+    model = load_demo_model()
+    if model is None:
         return
-
-    print("Loading model...")
-    model = tf.keras.models.load_model(MODEL_PATH)
     
     cap = cv2.VideoCapture(0)
     
@@ -40,7 +59,7 @@ def run_webcam_demo():
         processed = np.expand_dims(processed, axis=0)
         
         # Prediction
-        preds = model.predict(processed, verbose=0)
+        preds = model.predict(processed)
         class_id = np.argmax(preds)
         confidence = np.max(preds)
         
@@ -59,5 +78,185 @@ def run_webcam_demo():
     cap.release()
     cv2.destroyAllWindows()
 
+def square_box(x, y, w, h, frame_w, frame_h, pad=0.15):
+    """
+    Grow a box to a padded square (signs are roughly square) clipped to the frame.
+    """
+    size = int(max(w, h) * (1 + pad))
+    cx, cy = x + w // 2, y + h // 2
+    x0 = min(max(cx - size // 2, 0), max(frame_w - size, 0))
+    y0 = min(max(cy - size // 2, 0), max(frame_h - size, 0))
+    return x0, y0, min(size, frame_w), min(size, frame_h)
+
+def propose_regions(frame, grid=2, max_color_regions=8, min_area=400):
+    """
+    Candidate sign regions as (x, y, w, h): the centre crop, an overlapping
+    grid of tiles, and boxes around strongly red or blue blobs.
+    """
+    h, w = frame.shape[:2]
+    size = min(h, w)
+    boxes = [((w - size) // 2, (h - size) // 2, size, size)]
+
+    tile = int(size / grid * 1.25)
+    for row in range(grid):
+        for col in range(grid):
+            x = int(col * (w - tile) / max(grid - 1, 1))
+            y = int(row * (h - tile) / max(grid - 1, 1))
+            boxes.append((x, y, tile, tile))
+
+    # Proposals are computed on a downscaled frame, which is plenty for blob detection
+    scale = 4
+    small = cv2.resize(frame, (w // scale, h // scale), interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    mask = np.zeros(hsv.shape[:2], dtype=np.uint8)
+    for lower, upper in COLOR_RANGES:
+        mask |= cv2.inRange(hsv, lower, upper)
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, np.ones((3, 3), np.uint8))
+
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    contours = sorted(contours, key=cv2.contourArea, reverse=True)[:max_color_regions]
+    for contour in contours:
+        x, y, bw, bh = cv2.boundingRect(contour)
+        if bw * bh * scale * scale < min_area or not 0.5 < bw / bh < 2.0:
+            continue
+        boxes.append(square_box(x * scale, y * scale, bw * scale, bh * scale, w, h))
+    return boxes
+
+def crop_batch(rgb_frame, boxes, out=None):
+    """
+    Resize every region into one float32 (N, 32, 32, 3) batch in [0, 1].
+    """
+    if out is None or len(out) < len(boxes):
+        out = np.empty((len(boxes),) + INPUT_SIZE + (3,), dtype=np.float32)
+    batch = out[:len(boxes)]
+    for i, (x, y, w, h) in enumerate(boxes):
+        batch[i] = cv2.resize(rgb_frame[y:y + h, x:x + w], INPUT_SIZE, interpolation=cv2.INTER_AREA)
+    batch *= 1.0 / 255.0
+    return batch, out
+
+def put_latest(q, item):
+    """
+    Put into a size-1 queue, replacing whatever is there so consumers only see fresh data.
+    """
+    try:
+        q.get_nowait()
+    except queue.Empty:
+        pass
+    q.put_nowait(item)
+
+def capture_loop(cap, frames, display, stop):
+    while not stop.is_set():
+        ret, frame = cap.read()
+        if not ret:
+            stop.set()
+            break
+        captured_at = time.perf_counter()
+        put_latest(frames, (captured_at, frame))
+        put_latest(display, frame)
+
+def inference_loop(model, frames, results, stop, grid):
+    buffer = None
+    while not stop.is_set():
+        try:
+            captured_at, frame = frames.get(timeout=0.1)
+        except queue.Empty:
+            continue
+
+        boxes = propose_regions(frame, grid=grid)
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        batch, buffer = crop_batch(rgb_frame, boxes, buffer)
+        # All regions of a frame go through the model in one forward pass
+        preds = model.predict(batch)
+
+        detections = [
+            (box, int(np.argmax(p)), float(np.max(p)))
+            for box, p in zip(boxes, preds)
+        ]
+        put_latest(results, (captured_at, time.perf_counter(), detections))
+
+def run_pipelined_demo(min_confidence=0.6, grid=2):
+    """
+    Capture, inference and rendering run concurrently, linked by size-1
+    queues that drop stale frames. Every captured frame is shown with the
+    most recent detections drawn over it, so the display keeps up with the
+    camera even when inference can't process every frame.
+    """
+    model = load_demo_model()
+    if model is None:
+        return
+
+    cap = cv2.VideoCapture(0)
+    frames, display, results = queue.Queue(maxsize=1), queue.Queue(maxsize=1), queue.Queue(maxsize=1)
+    stop = threading.Event()
+    workers = [
+        threading.Thread(target=capture_loop, args=(cap, frames, display, stop), daemon=True),
+        threading.Thread(target=inference_loop, args=(model, frames, results, stop, grid), daemon=True),
+    ]
+    for worker in workers:
+        worker.start()
+
+    print("Webcam started (pipelined). Press 'q' to quit.")
+    fps, inference_fps, latency, last_result = 0.0, 0.0, 0.0, None
+    detections = []
+    last_shown = last_inferred = time.perf_counter()
+    while not stop.is_set():
+        try:
+            frame = display.get(timeout=0.5)
+        except queue.Empty:
+            continue
+
+        now = time.perf_counter()
+        # Exponential moving averages keep the overlay readable
+        fps = 0.9 * fps + 0.1 * (1.0 / max(now - last_shown, 1e-6))
+        last_shown = now
+        try:
+            captured_at, inferred_at, detections = results.get_nowait()
+            inference_fps = 0.9 * inference_fps + 0.1 * (1.0 / max(inferred_at - last_inferred, 1e-6))
+            latency = 0.9 * latency + 0.1 * (inferred_at - captured_at) * 1000
+            last_inferred = inferred_at
+        except queue.Empty:
+            pass  # Keep drawing the previous detections until new ones arrive
+
+        # The inference thread may still be reading this frame
+        frame = frame.copy()
+        best = None
+        for (x, y, w, h), class_id, confidence in detections:
+            if confidence < min_confidence:
+                continue
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+            cv2.putText(frame, f"{get_class_name(class_id)} ({confidence*100:.0f}%)", (x, max(y - 8, 15)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+            if best is None or confidence > best[1]:
+                best = (class_id, confidence)
+
+        if best is not None:
+            last_result = f"{get_class_name(best[0])} ({best[1]*100:.1f}%)"
+        if last_result:
+            cv2.putText(frame, last_result, (20, 50), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        cv2.putText(frame,
+                    f"{fps:.1f} FPS | inference {inference_fps:.1f} FPS, {latency:.0f} ms | "
+                    f"{len(detections)} regions",
+                    (20, frame.shape[0] - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+
+        cv2.imshow('Traffic Sign Recognition - Local Demo', frame)
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
+
+    stop.set()
+    for worker in workers:
+        worker.join(timeout=1)
+    cap.release()
+    cv2.destroyAllWindows()
+
 if __name__ == "__main__":
-    run_webcam_demo()
+    parser = argparse.ArgumentParser(description="Local webcam traffic sign recognition demo.")
+    parser.add_argument('--pipelined', action='store_true',
+                        help="threaded capture/inference/render with multi-region detection")
+    parser.add_argument('--min-confidence', type=float, default=0.6)
+    parser.add_argument('--grid', type=int, default=2, help="tiles per side for region proposals")
+    args = parser.parse_args()
+
+    if args.pipelined:
+        run_pipelined_demo(args.min_confidence, args.grid)
+    else:
+        run_webcam_demo()
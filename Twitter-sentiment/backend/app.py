@@ -1,12 +1,21 @@
 import time
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
-from collections import defaultdict
-from storage import predictions, add_prediction
+from typing import List
+from storage import (
+    add_prediction, stats_by_minute, recent_predictions, close as close_storage
+)
 
-from sentiment import predict_sentiment
+from sentiment import (
+    predict_batch, require_model, load_in_background, is_ready, model_status,
+    MODEL_VERSION, ModelNotReady
+)
+from batching import BatchingEngine
+from cache import PredictionCache
 from logger import logger
+import metrics
 import config
 
 app = FastAPI(title="Twitter Sentiment API")
@@ -21,14 +30,72 @@ app.add_middleware(
 class TweetInput(BaseModel):
     tweet: str
 
+class TweetBatchInput(BaseModel):
+    tweets: List[str]
+
+engine = BatchingEngine(
+    predict_batch,
+    max_batch_size=config.BATCH_MAX_SIZE,
+    max_wait_ms=config.BATCH_MAX_WAIT_MS,
+    # Requests that need the model fail fast with 503 while it is loading
+    # (MODEL_LOAD=lazy starts the load here) or after a failed load
+    prepare=require_model
+)
+
+prediction_cache = PredictionCache(
+    MODEL_VERSION,
+    max_entries=config.CACHE_SIZE,
+    ttl_seconds=config.CACHE_TTL_SECONDS,
+    shared_path=config.CACHE_SHARED_PATH
+)
+
+def classify_tweets(tweets):
+    """
+    Answer repeated tweets from the cache and send only the rest to the model.
+    """
+    keys = [prediction_cache.key(tweet) for tweet in tweets]
+    found = {}
+    for key in set(keys):
+        found[key] = prediction_cache.get(key)
+    hits = sum(result is not None for result in found.values())
+    metrics.CACHE_LOOKUPS.labels("hit").inc(hits)
+    metrics.CACHE_LOOKUPS.labels("miss").inc(len(found) - hits)
+
+    # One forward pass per distinct normalized tweet, even within a batch
+    missing = {key: tweet for key, tweet in zip(keys, tweets) if found[key] is None}
+    if missing:
+        for key, result in zip(missing, engine.submit_many(list(missing.values()))):
+            prediction_cache.put(key, result)
+            found[key] = result
+    return [found[key] for key in keys]
+
 from rate_limit import is_rate_limited
 
+@app.on_event("startup")
+def start_model_loading():
+    # The server accepts connections right away; /ready reports when the model can serve
+    if config.MODEL_LOAD == "startup":
+        load_in_background()
+
+@app.on_event("shutdown")
+def flush_storage():
+    # Write predictions and cache rows still queued before the worker exits
+    close_storage()
+    prediction_cache.close()
+
+@app.get("/ready")
+def ready():
+    if not is_ready():
+        return JSONResponse(status_code=503, content={"ready": False, **model_status})
+    return {"ready": True, **model_status}
+
 @app.post("/predict")
 def predict(data: TweetInput, request: Request):
     if is_rate_limited(request.client.host):
+        metrics.RATE_LIMITED.labels("predict").inc()
         raise HTTPException(429, "Too many requests. Please wait a minute.")
         
-    start = time.time()
+    start = time.perf_counter()
 
     if not data.tweet.strip():
         raise HTTPException(400, "Empty tweet")
@@ -37,12 +104,17 @@ def predict(data: TweetInput, request: Request):
         raise HTTPException(400, "Tweet too long")
 
     try:
-        sentiment, confidence = predict_sentiment(data.tweet)
+        sentiment, confidence = classify_tweets([data.tweet])[0]
+    except ModelNotReady:
+        raise HTTPException(503, "Model is not ready yet. Please retry shortly.")
     except Exception as e:
         logger.error(str(e))
+        metrics.ERRORS.labels("predict").inc()
         raise HTTPException(500, "Prediction failed")
 
-    latency = round((time.time() - start) * 1000, 2)
+    elapsed = time.perf_counter() - start
+    latency = round(elapsed * 1000, 2)
+    metrics.REQUEST_SECONDS.labels("predict").observe(elapsed)
     add_prediction(sentiment)
     logger.info(
         f"IP={request.client.host} | Sentiment={sentiment} | Confidence={confidence}"
@@ -54,51 +126,65 @@ def predict(data: TweetInput, request: Request):
         "latency_ms": latency
     }
 
+@app.post("/predict_batch")
+def predict_many(data: TweetBatchInput, request: Request):
+    if is_rate_limited(request.client.host, "predict_batch"):
+        metrics.RATE_LIMITED.labels("predict_batch").inc()
+        raise HTTPException(429, "Too many requests. Please wait a minute.")
+
+    start = time.perf_counter()
+
+    if not data.tweets:
+        raise HTTPException(400, "No tweets provided")
+
+    if len(data.tweets) > config.MAX_BATCH_TWEETS:
+        raise HTTPException(
+            400, f"At most {config.MAX_BATCH_TWEETS} tweets per request"
+        )
+
+    for i, tweet in enumerate(data.tweets):
+        if not tweet.strip():
+            raise HTTPException(400, f"Empty tweet at index {i}")
+        if len(tweet) > config.MAX_TEXT_LENGTH:
+            raise HTTPException(400, f"Tweet too long at index {i}")
+
+    try:
+        results = classify_tweets(data.tweets)
+    except ModelNotReady:
+        raise HTTPException(503, "Model is not ready yet. Please retry shortly.")
+    except Exception as e:
+        logger.error(str(e))
+        metrics.ERRORS.labels("predict_batch").inc()
+        raise HTTPException(500, "Prediction failed")
+
+    elapsed = time.perf_counter() - start
+    latency = round(elapsed * 1000, 2)
+    metrics.REQUEST_SECONDS.labels("predict_batch").observe(elapsed)
+    for sentiment, _ in results:
+        add_prediction(sentiment)
+    logger.info(f"IP={request.client.host} | Batch={len(results)}")
+
+    return {
+        "results": [
+            {"sentiment": sentiment, "confidence": confidence}
+            for sentiment, confidence in results
+        ],
+        "latency_ms": latency
+    }
+
+@app.get("/cache/stats")
+def cache_stats():
+    return prediction_cache.stats()
+
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/stats")
 def get_stats():
-    buckets = defaultdict(lambda: {"pos": 0, "neu": 0, "neg": 0})
-
-    for p in predictions:
-        minute = p["time"].strftime("%H:%M")
-        sentiment = p["sentiment"]
-        if sentiment == "Positive":
-            buckets[minute]["pos"] += 1
-        elif sentiment == "Neutral":
-            buckets[minute]["neu"] += 1
-        else:
-            buckets[minute]["neg"] += 1
-
-    response = []
-    for time, counts in buckets.items():
-        total = counts["pos"] + counts["neu"] + counts["neg"]
-        if total == 0:
-            continue
-
-        response.append({
-            "time": time,
-            "positive_count": counts["pos"],
-            "neutral_count": counts["neu"],
-            "negative_count": counts["neg"],
-            "total_count": total,
-            "positive_pct": round((counts["pos"] / total) * 100, 2),
-            "neutral_pct": round((counts["neu"] / total) * 100, 2),
-            "negative_pct": round((counts["neg"] / total) * 100, 2)
-        })
-
-    return response
+    return stats_by_minute()
 
 
 @app.get("/recent")
 def get_recent_predictions():
-    
-    recent = predictions[-10:] if predictions else []
-    
-    
-    formatted_recent = []
-    for p in recent:
-        formatted_recent.append({
-            "time": p["time"].isoformat(),
-            "sentiment": p["sentiment"]
-        })
-    
-    return formatted_recent
\ No newline at end of file
+    return recent_predictions(10)
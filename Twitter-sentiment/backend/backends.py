@@ -0,0 +1,173 @@
+import os
+import time
+import shutil
+
+import numpy as np
+import config
+from logger import logger
+from metrics import STAGE_SECONDS, BATCH_SIZE
+
+MODEL_NAME = "cardiffnlp/twitter-roberta-base-sentiment"
+LABELS = ["Negative", "Neutral", "Positive"]
+BACKENDS = ("pytorch", "quantized", "onnx")
+
+QUANTIZED_PATH = config.TRANSFORMER_DIR / "quantized.pt"
+ONNX_PATH = config.TRANSFORMER_DIR / "model.onnx"
+# Local copy of the hub tokenizer and fp32 weights, written on first download
+SNAPSHOT_DIR = config.TRANSFORMER_DIR / "snapshot"
+
+
+class TorchBackend:
+    tensor_type = "pt"
+
+    def __init__(self, model):
+        import torch
+        self.torch = torch
+        self.model = model.eval()
+
+    def logits(self, batch):
+        with self.torch.inference_mode():
+            return self.model(**batch).logits.float().numpy()
+
+
+class ONNXBackend:
+    tensor_type = "np"
+
+    def __init__(self, path):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(path), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def logits(self, batch):
+        feed = {
+            k: np.asarray(v, dtype=np.int64)
+            for k, v in batch.items()
+            if k in self.input_names
+        }
+        return self.session.run(["logits"], feed)[0]
+
+
+def save_snapshot(tokenizer, model):
+    """
+    Save the tokenizer and model next to the other artifacts so later starts
+    load from local safetensors without contacting the hub.
+    """
+    tmp_dir = SNAPSHOT_DIR.with_name(SNAPSHOT_DIR.name + ".tmp")
+    try:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        tokenizer.save_pretrained(tmp_dir)
+        model.save_pretrained(tmp_dir)
+        os.replace(tmp_dir, SNAPSHOT_DIR)
+    except OSError as e:
+        # e.g. a read-only image; the hub cache still works
+        logger.warning(f"Could not save model snapshot to {SNAPSHOT_DIR}: {e}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def load_tokenizer():
+    from transformers import AutoTokenizer
+    source = SNAPSHOT_DIR if SNAPSHOT_DIR.exists() else MODEL_NAME
+    return AutoTokenizer.from_pretrained(source)
+
+
+def load_fp32_model():
+    from transformers import AutoModelForSequenceClassification
+    if SNAPSHOT_DIR.exists():
+        return AutoModelForSequenceClassification.from_pretrained(SNAPSHOT_DIR)
+
+    model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
+    save_snapshot(load_tokenizer(), model)
+    return model
+
+
+def quantize(model):
+    """
+    Dynamic int8 quantization of every Linear layer; activations stay fp32.
+    """
+    import torch
+    return torch.ao.quantization.quantize_dynamic(
+        model.eval(), {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def load_backend(name):
+    if name == "pytorch":
+        return TorchBackend(load_fp32_model())
+
+    if name == "quantized":
+        if QUANTIZED_PATH.exists():
+            import torch
+            # Our own artifact from convert.py, so unpickling the full module is fine
+            return TorchBackend(torch.load(QUANTIZED_PATH, weights_only=False))
+        return TorchBackend(quantize(load_fp32_model()))
+
+    if name == "onnx":
+        if not ONNX_PATH.exists():
+            raise FileNotFoundError(
+                f"{ONNX_PATH} not found. Run `python convert.py --backend onnx` first."
+            )
+        return ONNXBackend(ONNX_PATH)
+
+    raise ValueError(
+        f"Unknown inference backend '{name}'. Choose one of: {', '.join(BACKENDS)}"
+    )
+
+
+def length_buckets(lengths, max_batch_size, max_batch_tokens):
+    """
+    Group indices by token length so each group pads to a similar length,
+    keeping every group's padded size under max_batch_tokens.
+    """
+    buckets, current = [], []
+    for i in sorted(range(len(lengths)), key=lengths.__getitem__):
+        # Sorted ascending, so lengths[i] is the padded length if i joins the group
+        full = len(current) >= max_batch_size
+        too_long = (len(current) + 1) * lengths[i] > max_batch_tokens
+        if current and (full or too_long):
+            buckets.append(current)
+            current = []
+        current.append(i)
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+def classify(tokenizer, runtime, texts, max_batch_size=32, max_batch_tokens=4096):
+    """
+    Classify many tweets, one forward pass per length bucket.
+    Returns [(label, confidence), ...] in input order.
+    """
+    start = time.perf_counter()
+    encoded = tokenizer(texts, truncation=True)
+    lengths = [len(ids) for ids in encoded["input_ids"]]
+    results = [None] * len(texts)
+    tokenize, forward, postprocess = time.perf_counter() - start, 0.0, 0.0
+
+    for bucket in length_buckets(lengths, max_batch_size, max_batch_tokens):
+        t0 = time.perf_counter()
+        batch = tokenizer.pad(
+            {key: [encoded[key][i] for i in bucket] for key in encoded.keys()},
+            return_tensors=runtime.tensor_type
+        )
+        t1 = time.perf_counter()
+        logits = runtime.logits(batch)
+        t2 = time.perf_counter()
+        scores = np.exp(logits - logits.max(axis=1, keepdims=True))
+        scores /= scores.sum(axis=1, keepdims=True)
+        for i, row in zip(bucket, scores):
+            sentiment_id = int(row.argmax())
+            results[i] = (LABELS[sentiment_id], round(float(row[sentiment_id]), 3))
+        t3 = time.perf_counter()
+        tokenize += t1 - t0
+        forward += t2 - t1
+        postprocess += t3 - t2
+
+    STAGE_SECONDS.labels("tokenize").observe(tokenize)
+    STAGE_SECONDS.labels("forward").observe(forward)
+    STAGE_SECONDS.labels("postprocess").observe(postprocess)
+    BATCH_SIZE.observe(len(texts))
+    return results
@@ -0,0 +1,84 @@
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+
+class BatchingEngine:
+    """
+    Collects tweets submitted concurrently by request threads and runs them
+    through `predict_batch` together on a single background thread.
+
+    `prepare`, if given, runs in the request thread before its tweets are
+    queued (e.g. a model readiness check), so it is not counted against
+    `timeout` and never stalls other requests' batches.
+    """
+
+    def __init__(self, predict_batch, max_batch_size=32, max_wait_ms=5, timeout=30,
+                 prepare=None):
+        self.predict_batch = predict_batch
+        self.prepare = prepare
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, text):
+        """
+        Blocks until the tweet has been classified; returns (label, confidence).
+        """
+        return self.submit_many([text])[0]
+
+    def submit_many(self, texts):
+        """
+        Blocks until every tweet has been classified, for at most `timeout`
+        seconds in total.
+        """
+        if self.prepare is not None:
+            self.prepare()
+        self._ensure_started()
+        futures = []
+        for text in texts:
+            future = Future()
+            self._queue.put((text, future))
+            futures.append(future)
+        deadline = time.monotonic() + self.timeout
+        return [
+            future.result(timeout=max(0.0, deadline - time.monotonic()))
+            for future in futures
+        ]
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _collect(self):
+        # Wait for the first tweet, then give others up to max_wait to join it
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    items.append(self._queue.get(timeout=remaining))
+                else:
+                    items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            try:
+                results = self.predict_batch([text for text, _ in items])
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(items, results):
+                future.set_result(result)
@@ -0,0 +1,252 @@
+import re
+import time
+import queue
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+from logger import logger
+
+URL_PATTERN = re.compile(r"https?://\S+|www\.\S+")
+MENTION_PATTERN = re.compile(r"@\w+")
+RETWEET_PREFIX = re.compile(r"^rt @user:?\s+")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """
+    Canonical form used as the cache key: lowercase, every URL and @mention
+    replaced by a placeholder, a leading "RT @user:" dropped and whitespace collapsed.
+    """
+    text = text.lower()
+    text = URL_PATTERN.sub("http", text)
+    text = MENTION_PATTERN.sub("@user", text)
+    text = WHITESPACE_PATTERN.sub(" ", text).strip()
+    return RETWEET_PREFIX.sub("", text)
+
+
+class SharedStore:
+    """
+    SQLite table shared by every worker process on the host.
+
+    The cache is only an optimisation, so it fails open: a locked or broken
+    database counts as a miss, and writes that can't be made are dropped.
+    `put` only queues the row; a background thread writes queued rows in
+    one transaction per batch, off the request path.
+    """
+
+    def __init__(self, path, max_entries, batch_size=200, flush_interval=0.2,
+                 max_pending=10000):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._closed = False
+
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS prediction_cache "
+            "(key TEXT PRIMARY KEY, sentiment TEXT, confidence REAL, expires_at REAL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_cache_expires "
+            "ON prediction_cache (expires_at)"
+        )
+        conn.commit()
+        conn.close()
+
+        # Reads come from request threads; the writer thread has its own connection
+        self._read_conn = self._connect()
+        self._read_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._run, daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        # Short busy timeout: a request should not wait long on the cache
+        conn = sqlite3.connect(self.path, timeout=0.5, check_same_thread=False)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def get(self, key, now):
+        with self._read_lock:
+            try:
+                row = self._read_conn.execute(
+                    "SELECT sentiment, confidence, expires_at FROM prediction_cache "
+                    "WHERE key = ?",
+                    (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Shared cache unavailable, treating as a miss: {e}")
+                self._rollback(self._read_conn)
+                return None
+        if row is None or row[2] <= now:
+            return None
+        return (row[0], row[1]), row[2]
+
+    def put(self, key, value, expires_at):
+        if self._closed:
+            return
+        try:
+            self._queue.put_nowait((key, value[0], value[1], expires_at))
+        except queue.Full:
+            pass  # The writer is behind; skipping a cache write is harmless
+
+    def close(self):
+        """
+        Write whatever is still queued and stop the writer thread.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout=5)
+        self._read_conn.close()
+
+    def _collect(self):
+        # Wait for the first row, then take what else arrives within flush_interval
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while items[-1] is not None and len(items) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    items.append(self._queue.get(timeout=remaining))
+                else:
+                    items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        conn = self._connect()
+        writes = 0
+        while True:
+            items = self._collect()
+            stop = items[-1] is None
+            rows = [item for item in items if item is not None]
+            if rows:
+                try:
+                    with conn:
+                        conn.executemany(
+                            "INSERT OR REPLACE INTO prediction_cache "
+                            "VALUES (?, ?, ?, ?)",
+                            rows
+                        )
+                        # Trim roughly every 1000 writes
+                        if writes // 1000 != (writes + len(rows)) // 1000:
+                            self._trim(conn)
+                except sqlite3.Error as e:
+                    logger.warning(
+                        f"Could not write {len(rows)} shared cache rows: {e}"
+                    )
+                    self._rollback(conn)
+                writes += len(rows)
+            if stop:
+                conn.close()
+                return
+
+    def _trim(self, conn):
+        # Drop expired rows, then the soonest-expiring ones beyond max_entries
+        conn.execute(
+            "DELETE FROM prediction_cache WHERE expires_at <= ?", (time.time(),)
+        )
+        conn.execute(
+            "DELETE FROM prediction_cache WHERE key IN "
+            "(SELECT key FROM prediction_cache "
+            "ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    @staticmethod
+    def _rollback(conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            pass
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache with a time-to-live for (sentiment, confidence) results,
+    keyed by the model version and the normalized tweet. With `shared_path`
+    set, misses fall through to a SQLite table shared across worker processes.
+    """
+
+    def __init__(self, model_version, max_entries=10000, ttl_seconds=3600,
+                 shared_path=None):
+        self.model_version = model_version
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._shared = SharedStore(shared_path, max_entries) if shared_path else None
+
+    def key(self, text):
+        normalized = normalize_text(text)
+        data = f"{self.model_version}\n{normalized}".encode()
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        if self._shared is not None:
+            entry = self._shared.get(key, now)
+            if entry is not None:
+                self._store(key, *entry)
+                with self._lock:
+                    self.shared_hits += 1
+                return entry[0]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        self._store(key, value, expires_at)
+        if self._shared is not None:
+            self._shared.put(key, value, expires_at)
+
+    def _store(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def close(self):
+        if self._shared is not None:
+            self._shared.close()
+
+    def stats(self):
+        hits = self.hits + self.shared_hits
+        total = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "model_version": self.model_version,
+            "shared": self._shared is not None,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+        }
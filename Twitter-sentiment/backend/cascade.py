@@ -0,0 +1,168 @@
+"""
+Cascade inference: the TF-IDF + LogisticRegression model from ml/train.py
+answers the tweets it is confident about, and only the rest go on to the
+transformer. Serve it with INFERENCE_MODE=cascade.
+
+Report the escalation rate and agreement with the transformer alone for a
+few thresholds, to choose CASCADE_THRESHOLD:
+
+    python cascade.py --samples 2000 --thresholds 0.8 0.9 0.95
+"""
+import time
+import random
+import pickle
+import argparse
+
+import config
+from backends import load_tokenizer, load_backend, classify
+from metrics import STAGE_SECONDS, CASCADE_TWEETS, CASCADE_AUDITS
+
+LINEAR_MODEL_PATH = config.MODEL_DIR / "trained_model.sav"
+VECTORIZER_PATH = config.MODEL_DIR / "vectorizer.pkl"
+
+
+class LinearModel:
+    def __init__(self, model_path=LINEAR_MODEL_PATH, vectorizer_path=VECTORIZER_PATH):
+        # Needs the NLTK stopwords, so only imported when the cascade is used
+        from preprocess import preprocess_text
+        self.preprocess = preprocess_text
+
+        for path in (model_path, vectorizer_path):
+            if not path.exists():
+                raise FileNotFoundError(
+                    f"{path} not found. Train it with `python train.py` in ml/ first."
+                )
+        with open(model_path, "rb") as f:
+            self.model = pickle.load(f)
+        with open(vectorizer_path, "rb") as f:
+            self.vectorizer = pickle.load(f)
+        # ml/train.py maps Sentiment140's 4 to 1, so class 1 is positive
+        self.positive_index = list(self.model.classes_).index(1)
+
+    def positive_probability(self, texts):
+        features = self.vectorizer.transform([self.preprocess(text) for text in texts])
+        return self.model.predict_proba(features)[:, self.positive_index]
+
+
+def linear_labels(probabilities):
+    """
+    Map P(positive) from the binary model onto the API's labels. The linear
+    model has no neutral class; tweets it is unsure about are escalated, so
+    "Neutral" only ever comes from the transformer.
+    """
+    return [
+        ("Positive", round(float(p), 3)) if p >= 0.5
+        else ("Negative", round(float(1 - p), 3))
+        for p in probabilities
+    ]
+
+
+def cascade_classify(linear, transformer, texts, threshold, audit_rate=0.0):
+    """
+    Classify with the linear model and send tweets whose confidence is below
+    `threshold` to `transformer` (texts -> [(label, confidence), ...]).
+    With `audit_rate` > 0, that fraction of the confident tweets also goes to
+    the transformer, and agreement is counted in the metrics.
+    Returns [(label, confidence), ...] in input order.
+    """
+    start = time.perf_counter()
+    results = linear_labels(linear.positive_probability(texts))
+    STAGE_SECONDS.labels("linear").observe(time.perf_counter() - start)
+
+    escalate = [
+        i for i, (_, confidence) in enumerate(results) if confidence < threshold
+    ]
+    audit = [i for i, (_, confidence) in enumerate(results)
+             if confidence >= threshold and audit_rate and random.random() < audit_rate]
+
+    if escalate or audit:
+        second_opinion = transformer([texts[i] for i in escalate + audit])
+        for i, result in zip(escalate, second_opinion):
+            results[i] = result
+        for i, result in zip(audit, second_opinion[len(escalate):]):
+            agreed = result[0] == results[i][0]
+            CASCADE_AUDITS.labels("agree" if agreed else "disagree").inc()
+
+    CASCADE_TWEETS.labels("linear").inc(len(texts) - len(escalate))
+    CASCADE_TWEETS.labels("transformer").inc(len(escalate))
+    return results
+
+
+def report(reference, probabilities, threshold, linear_seconds, transformer_seconds):
+    """
+    Escalation rate and agreement with the transformer-only labels at one threshold.
+    Tweets that escalate get the transformer's answer, so disagreement can
+    only come from the confident ones.
+    """
+    confident = [
+        (label, ref[0])
+        for (label, confidence), ref in zip(linear_labels(probabilities), reference)
+        if confidence >= threshold
+    ]
+    n = len(reference)
+    escalation = 1 - len(confident) / n
+    agree_confident = sum(a == b for a, b in confident)
+    confident_agreement = None
+    if confident:
+        confident_agreement = round(agree_confident / len(confident), 4)
+    seconds = linear_seconds + escalation * transformer_seconds
+    return {
+        "threshold": threshold,
+        "escalation_rate": round(escalation, 4),
+        "agreement": round((agree_confident + n - len(confident)) / n, 4),
+        "confident_agreement": confident_agreement,
+        "ms_per_tweet": round(seconds * 1000 / n, 3),
+    }
+
+
+def main():
+    from convert import load_corpus
+
+    parser = argparse.ArgumentParser(
+        description="Measure the linear -> transformer cascade against the "
+                    "transformer alone."
+    )
+    parser.add_argument(
+        "--samples", type=int, default=1000, help="tweets used for the comparison"
+    )
+    parser.add_argument(
+        "--thresholds", type=float, nargs="+", default=[0.7, 0.8, 0.9, 0.95]
+    )
+    args = parser.parse_args()
+
+    texts = load_corpus(args.samples)
+    linear = LinearModel()
+    tokenizer = load_tokenizer()
+    runtime = load_backend(config.INFERENCE_BACKEND)
+    classify(tokenizer, runtime, texts[:8])  # warm-up
+
+    start = time.perf_counter()
+    reference = classify(
+        tokenizer, runtime, texts, config.BATCH_MAX_SIZE, config.MAX_BATCH_TOKENS
+    )
+    transformer_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    probabilities = linear.positive_probability(texts)
+    linear_seconds = time.perf_counter() - start
+
+    neutral = sum(label == "Neutral" for label, _ in reference) / len(texts)
+    print(f"{len(texts)} tweets, {neutral:.1%} neutral according to the transformer")
+    print(
+        f"transformer ({config.INFERENCE_BACKEND}): "
+        f"{transformer_seconds * 1000 / len(texts):.3f} ms/tweet   "
+        f"linear: {linear_seconds * 1000 / len(texts):.3f} ms/tweet"
+    )
+    for threshold in args.thresholds:
+        r = report(
+            reference, probabilities, threshold, linear_seconds, transformer_seconds
+        )
+        print(
+            f"threshold {threshold:.2f}  escalated {r['escalation_rate']:.1%}  "
+            f"agreement {r['agreement']:.2%}  "
+            f"(confident only {r['confident_agreement']})  "
+            f"~{r['ms_per_tweet']} ms/tweet"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,59 @@
+import os
+from pathlib import Path
+
+MODEL_DIR = Path(__file__).resolve().parent.parent / "model"
+
 ALLOWED_ORIGINS = ["*"]
 MAX_TEXT_LENGTH = 500
+
+# Concurrent /predict calls are classified together in one forward pass
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", 32))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", 5))
+# Upper bound on padded tokens (tweets x longest tweet) in one forward pass
+MAX_BATCH_TOKENS = int(os.getenv("MAX_BATCH_TOKENS", 4096))
+MAX_BATCH_TWEETS = 256
+
+# Transformer runtime: pytorch (fp32), quantized (dynamic int8) or onnx; see convert.py
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "pytorch")
+TRANSFORMER_DIR = MODEL_DIR / "transformer"
+# "transformer" classifies every tweet with the transformer; "cascade" tries the
+# TF-IDF model first, see cascade.py
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "transformer")
+# Cascade: linear answers below this confidence go to the transformer, and this
+# fraction of the rest is audited
+CASCADE_THRESHOLD = float(os.getenv("CASCADE_THRESHOLD", 0.9))
+CASCADE_AUDIT_RATE = float(os.getenv("CASCADE_AUDIT_RATE", 0))
+# "startup" loads the model in the background when the API starts; "lazy" starts
+# loading on the first request
+MODEL_LOAD = os.getenv("MODEL_LOAD", "startup")
+# After a failed load, requests get 503 for this long before a new load is tried
+MODEL_LOAD_RETRY_SECONDS = float(os.getenv("MODEL_LOAD_RETRY_SECONDS", 30))
+
+# Results for repeated tweets (compared after normalizing case, URLs and
+# @mentions); 0 disables
+CACHE_SIZE = int(os.getenv("CACHE_SIZE", 10000))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", 3600))
+# SQLite file shared by all workers on the host, e.g. /tmp/sentiment_cache.db;
+# unset keeps the cache per process
+CACHE_SHARED_PATH = os.getenv("CACHE_SHARED_PATH")
+
+# Requests allowed per client IP per minute on each route (token bucket, so short
+# bursts up to the limit)
+RATE_LIMITS = {
+    "predict": int(os.getenv("RATE_LIMIT_PREDICT", 10)),
+    "predict_batch": int(os.getenv("RATE_LIMIT_PREDICT_BATCH", 10)),
+}
+# SQLite file shared by all workers, e.g. /tmp/sentiment_rate_limit.db; unset
+# limits each worker separately
+RATE_LIMIT_SHARED_PATH = os.getenv("RATE_LIMIT_SHARED_PATH")
+
+# Where predictions for /stats and /recent are kept: "sqlite" (durable, shared by
+# all workers) or "memory"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite")
+STORAGE_PATH = os.getenv(
+    "STORAGE_PATH", str(MODEL_DIR.parent / "data" / "predictions.db")
+)
+# Minutes of per-minute counts kept for /stats, and predictions kept for /recent
+# by the memory backend
+STATS_RETENTION_MINUTES = int(os.getenv("STATS_RETENTION_MINUTES", 1440))
+RECENT_SIZE = 100
@@ -0,0 +1,181 @@
+"""
+One-off conversion of the sentiment transformer to a faster CPU backend,
+followed by a parity check against the fp32 PyTorch model:
+
+    python convert.py --backend quantized onnx
+    python convert.py --backend onnx --parity-only --samples 2000
+
+Serve a converted model by setting INFERENCE_BACKEND=quantized or onnx.
+"""
+import os
+import time
+import argparse
+
+import config
+from backends import (
+    TorchBackend, ONNXBackend, load_tokenizer, load_fp32_model, quantize, classify,
+    QUANTIZED_PATH, ONNX_PATH
+)
+
+CORPUS_PATH = config.MODEL_DIR.parent / "data" / "twitter.csv"
+
+# Used for the parity check when the Sentiment140 CSV is not available
+SAMPLE_TWEETS = [
+    "I love this new phone, the camera is amazing!",
+    "Worst customer service ever. Never flying with them again.",
+    "The meeting has been moved to 3pm tomorrow.",
+    "Can't believe we lost again... so frustrating",
+    "Just finished my first marathon!!! So proud 🏃",
+    "Traffic on the highway is terrible this morning",
+    "Anyone know a good pizza place downtown?",
+    "@airline my bag never arrived, still waiting for an answer",
+    "This update broke everything. Thanks a lot. 🙄",
+    "Happy birthday to my amazing sister ❤️",
+    "The weather today is okay I guess",
+    "New episode is out tonight, not sure what to expect",
+    "Absolutely thrilled with the results of the election",
+    "Why does my laptop always crash during presentations",
+    "Reading a book about the history of Rome",
+    "Best concert of my life, what a night!",
+    "I'm so tired of these delays https://t.co/xyz",
+    "Prices went up again. Great.",
+    "Lunch was fine, nothing special",
+    "Thank you all for the support, it means the world to me",
+]
+
+
+def load_corpus(samples):
+    if CORPUS_PATH.exists():
+        import pandas as pd
+        texts = pd.read_csv(
+            CORPUS_PATH, encoding="ISO-8859-1", header=None, usecols=[5]
+        )[5]
+        sample = texts.sample(min(samples, len(texts)), random_state=0)
+        return sample.astype(str).tolist()
+    print(
+        f"{CORPUS_PATH} not found, using {len(SAMPLE_TWEETS)} built-in sample tweets."
+    )
+    return SAMPLE_TWEETS
+
+
+def export_quantized(model):
+    import torch
+    os.makedirs(config.TRANSFORMER_DIR, exist_ok=True)
+    tmp_path = QUANTIZED_PATH.with_suffix(".tmp")
+    torch.save(quantize(model), tmp_path)
+    os.replace(tmp_path, QUANTIZED_PATH)
+
+
+def export_onnx(model, tokenizer):
+    import torch
+
+    class LogitsOnly(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+    os.makedirs(config.TRANSFORMER_DIR, exist_ok=True)
+    sample = tokenizer(
+        ["an example tweet", "another one"], padding=True, return_tensors="pt"
+    )
+    tmp_path = ONNX_PATH.with_suffix(".tmp.onnx")
+    torch.onnx.export(
+        LogitsOnly(model.eval()),
+        (sample["input_ids"], sample["attention_mask"]),
+        str(tmp_path),
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=17,
+    )
+    os.replace(tmp_path, ONNX_PATH)
+
+
+def run(tokenizer, runtime, texts):
+    start = time.perf_counter()
+    results = classify(
+        tokenizer, runtime, texts, config.BATCH_MAX_SIZE, config.MAX_BATCH_TOKENS
+    )
+    return results, time.perf_counter() - start
+
+
+def parity(tokenizer, reference, runtime, texts):
+    """
+    Agreement of labels with the fp32 model, and the largest confidence gap.
+    """
+    results, seconds = run(tokenizer, runtime, texts)
+    agree = sum(a[0] == b[0] for a, b in zip(reference, results))
+    gap = None
+    if agree:
+        gap = max(
+            abs(a[1] - b[1]) for a, b in zip(reference, results) if a[0] == b[0]
+        )
+    return {
+        "agreement": round(agree / len(texts), 4),
+        "max_confidence_gap": gap,
+        "ms_per_tweet": round(seconds * 1000 / len(texts), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert the sentiment transformer for faster CPU inference."
+    )
+    parser.add_argument(
+        "--backend", nargs="+", default=["quantized", "onnx"],
+        choices=["quantized", "onnx"]
+    )
+    parser.add_argument(
+        "--parity-only", action="store_true", help="skip conversion, only compare"
+    )
+    parser.add_argument(
+        "--samples", type=int, default=1000, help="tweets used for the parity check"
+    )
+    args = parser.parse_args()
+
+    model = load_fp32_model()
+    tokenizer = load_tokenizer()
+
+    if not args.parity_only:
+        for backend in args.backend:
+            print(f"Converting to {backend}...")
+            if backend == "quantized":
+                export_quantized(model)
+            else:
+                export_onnx(model, tokenizer)
+
+    texts = load_corpus(args.samples)
+    reference, seconds = run(tokenizer, TorchBackend(model), texts)
+    print(
+        f"pytorch    fp32 reference: {seconds * 1000 / len(texts):.3f} ms/tweet "
+        f"on {len(texts)} tweets"
+    )
+
+    for backend in args.backend:
+        path = QUANTIZED_PATH if backend == "quantized" else ONNX_PATH
+        if not path.exists():
+            print(f"{backend:10} not converted yet, skipping")
+            continue
+        if backend == "quantized":
+            import torch
+            runtime = TorchBackend(torch.load(path, weights_only=False))
+        else:
+            runtime = ONNXBackend(path)
+        report = parity(tokenizer, reference, runtime, texts)
+        size_mb = os.path.getsize(path) / 1e6
+        print(
+            f"{backend:10} agreement {report['agreement']:.2%}  "
+            f"max confidence gap {report['max_confidence_gap']}  "
+            f"{report['ms_per_tweet']} ms/tweet  {size_mb:.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,19 @@
+import atexit
+import queue
 import logging
+from logging.handlers import QueueHandler, QueueListener
 
-logging.basicConfig(
-    filename="app.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
+# Request threads only put records on a queue; a listener thread writes them to app.log
+file_handler = logging.FileHandler("app.log")
+file_handler.setFormatter(
+    logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
 )
 
+log_queue = queue.SimpleQueue()
+listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+listener.start()
+atexit.register(listener.stop)
+
 logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+logger.addHandler(QueueHandler(log_queue))
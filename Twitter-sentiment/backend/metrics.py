@@ -0,0 +1,157 @@
+import bisect
+import threading
+
+# Upper bounds in seconds, from sub-millisecond cache hits to slow CPU forward passes
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+REGISTRY = []
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+class Metric:
+    """
+    A named metric with optional labels. `labels(...)` returns the child for
+    one combination of label values, created on first use.
+    """
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        # labels() may add children from request threads while we render
+        with self._lock:
+            children = list(self._children.items())
+        for values, child in sorted(children, key=lambda item: item[0]):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+class _CounterValue:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {child.value}"]
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+class Histogram(Metric):
+    """
+    Fixed-bucket histogram: observe() is a binary search and two additions,
+    cheap enough for every request and every model batch.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def _render_child(self, values, child):
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + ("+Inf",), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, [("le", bound)])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {total}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+def render():
+    """
+    Every registered metric in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+REQUEST_SECONDS = Histogram(
+    "sentiment_request_seconds",
+    "Time to answer a prediction request, validation to response.",
+    ["route"]
+)
+STAGE_SECONDS = Histogram(
+    "sentiment_stage_seconds",
+    "Time spent in each inference stage per model batch.",
+    ["stage"]
+)
+BATCH_SIZE = Histogram(
+    "sentiment_batch_size",
+    "Tweets classified per model batch.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+CACHE_LOOKUPS = Counter(
+    "sentiment_cache_lookups_total", "Result cache lookups by outcome.", ["result"]
+)
+RATE_LIMITED = Counter(
+    "sentiment_rate_limited_total", "Requests rejected by the rate limiter.", ["route"]
+)
+ERRORS = Counter(
+    "sentiment_errors_total", "Requests that failed with a server error.", ["route"]
+)
+CASCADE_TWEETS = Counter(
+    "sentiment_cascade_tweets_total",
+    "Tweets answered by each model in cascade mode.",
+    ["model"]
+)
+CASCADE_AUDITS = Counter(
+    "sentiment_cascade_audits_total",
+    "Confident linear answers re-checked by the transformer.",
+    ["result"]
+)
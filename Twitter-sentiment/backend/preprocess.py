@@ -1,12 +1,17 @@
 import re
+from functools import lru_cache
 from nltk.stem import PorterStemmer
 from nltk.corpus import stopwords
 
 stop_words = set(stopwords.words('english'))
 port_stem = PorterStemmer()
 
+# The vocabulary is small next to the number of tokens, so each word is stemmed once
+stem = lru_cache(maxsize=100000)(port_stem.stem)
+
 def preprocess_text(text: str) -> str:
+    # Same cleaning as ml/train.py, so features match what the vectorizer was fitted on
     text = re.sub('[^a-zA-Z]', ' ', text)
     text = text.lower().split()
-    text = [port_stem.stem(word) for word in text if word not in stop_words]
+    text = [stem(word) for word in text if word not in stop_words and len(word) > 2]
     return ' '.join(text)
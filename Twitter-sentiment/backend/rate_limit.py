@@ -1,14 +1,113 @@
+import sqlite3
+import threading
 from time import time
+from collections import OrderedDict
 
-REQUESTS = {}
+import config
+from logger import logger
 
-def is_rate_limited(ip, limit=10):
-    now = time()
-    REQUESTS.setdefault(ip, [])
-    REQUESTS[ip] = [t for t in REQUESTS[ip] if now - t < 60]
+class TokenBucketLimiter:
+    """
+    Token bucket per key: holds up to `capacity` requests and refills at
+    capacity per `period` seconds. A bucket untouched for a whole period is
+    full again, so it is dropped instead of being kept around.
+    """
 
-    if len(REQUESTS[ip]) >= limit:
-        return True
+    def __init__(self, capacity, period=60):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.period = period
+        # key -> (tokens, last update), least recently used first
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
 
-    REQUESTS[ip].append(now)
-    return False
+    def allow(self, key):
+        now = time()
+        with self._lock:
+            self._evict_idle(now)
+            tokens, updated = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+            return allowed
+
+    def _evict_idle(self, now):
+        while self._buckets:
+            key, (_, updated) = next(iter(self._buckets.items()))
+            if now - updated < self.period:
+                break
+            del self._buckets[key]
+
+class SQLiteLimiter:
+    """
+    Same token buckets kept in a SQLite file, so every worker process on the
+    host draws from one bucket per client.
+    """
+
+    def __init__(self, path, capacity, period=60):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.period = period
+        self._calls = 0
+        # Short busy timeout: a request should not wait long on the limiter
+        self._conn = sqlite3.connect(
+            path, timeout=0.5, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits "
+            "(key TEXT PRIMARY KEY, tokens REAL, updated REAL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_rate_limits_updated "
+            "ON rate_limits (updated)"
+        )
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        with self._lock:
+            try:
+                return self._take(key, time())
+            except sqlite3.OperationalError as e:
+                # e.g. "database is locked" when other workers hold the write lock
+                # past the timeout. Fail open: a contended limiter should not turn
+                # into 500s for every client.
+                logger.warning(f"Rate limiter unavailable, allowing request: {e}")
+                return True
+            finally:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+
+    def _take(self, key, now):
+        # IMMEDIATE takes the write lock up front, so two workers
+        # cannot both spend the last token
+        self._conn.execute("BEGIN IMMEDIATE")
+        row = self._conn.execute(
+            "SELECT tokens, updated FROM rate_limits WHERE key = ?", (key,)
+        ).fetchone()
+        tokens, updated = row if row else (self.capacity, now)
+        tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+        allowed = tokens >= 1
+        self._conn.execute(
+            "INSERT OR REPLACE INTO rate_limits VALUES (?, ?, ?)",
+            (key, tokens - 1 if allowed else tokens, now)
+        )
+        self._calls += 1
+        if self._calls % 1000 == 0:
+            self._conn.execute(
+                "DELETE FROM rate_limits WHERE updated < ?", (now - self.period,)
+            )
+        self._conn.execute("COMMIT")
+        return allowed
+
+def make_limiter(capacity):
+    if config.RATE_LIMIT_SHARED_PATH:
+        return SQLiteLimiter(config.RATE_LIMIT_SHARED_PATH, capacity)
+    return TokenBucketLimiter(capacity)
+
+LIMITERS = {route: make_limiter(limit) for route, limit in config.RATE_LIMITS.items()}
+
+def is_rate_limited(ip, route="predict"):
+    # Routes may share one SQLite table, so the key carries the route as well
+    return not LIMITERS[route].allow(f"{route}:{ip}")
@@ -1,19 +1,124 @@
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
+import time
+import threading
+import config
+from backends import load_tokenizer, load_backend, classify, MODEL_NAME
+from cascade import LinearModel, cascade_classify
+from logger import logger
 
-MODEL_NAME = "cardiffnlp/twitter-roberta-base-sentiment"
+INFERENCE_MODES = ("transformer", "cascade")
+if config.INFERENCE_MODE not in INFERENCE_MODES:
+    raise ValueError(
+        f"Unknown inference mode '{config.INFERENCE_MODE}'. "
+        f"Choose one of: {', '.join(INFERENCE_MODES)}"
+    )
 
-tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
-model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
+# Part of every cache key, so switching backends never serves another model's results
+MODEL_VERSION = f"{MODEL_NAME}@{config.INFERENCE_BACKEND}"
+if config.INFERENCE_MODE == "cascade":
+    MODEL_VERSION += f"+cascade@{config.CASCADE_THRESHOLD}"
 
-LABELS = ["Negative", "Neutral", "Positive"]
+# Short and long inputs, so the first real request doesn't pay for kernel setup
+WARMUP_TWEETS = ["warm up", "warming up the sentiment model with a longer tweet " * 4]
 
-def predict_sentiment(text: str):
-    encoded = tokenizer(text, return_tensors="pt", truncation=True)
-    output = model(**encoded)
-    scores = torch.softmax(output.logits, dim=1)[0]
+tokenizer = None
+runtime = None
+linear = None
+model_status = {
+    "status": "not_loaded",
+    "backend": config.INFERENCE_BACKEND,
+    "mode": config.INFERENCE_MODE,
+}
+_load_lock = threading.Lock()
+_loader = None  # background loading thread
+_loader_lock = threading.Lock()  # not _load_lock, which is held for the whole load
+_failed_at = 0.0  # time.monotonic() of the last failed load
+
+class ModelNotReady(Exception):
+    pass
+
+def load_model():
+    """
+    Load the tokenizer and the configured backend, then run a warm-up pass.
+    Safe to call from several threads; only the first call does any work.
+    """
+    global tokenizer, runtime, linear, _failed_at
+    with _load_lock:
+        if runtime is not None:
+            return
+
+        model_status.update(status="loading", error=None)
+        start = time.time()
+        try:
+            new_linear = LinearModel() if config.INFERENCE_MODE == "cascade" else None
+            new_tokenizer = load_tokenizer()
+            new_runtime = load_backend(config.INFERENCE_BACKEND)
+            classify(new_tokenizer, new_runtime, WARMUP_TWEETS)
+        except Exception as e:
+            _failed_at = time.monotonic()
+            model_status.update(status="failed", error=str(e))
+            logger.error(f"Model loading failed: {e}")
+            raise
+
+        tokenizer, runtime, linear = new_tokenizer, new_runtime, new_linear
+        model_status.update(status="ready", load_seconds=round(time.time() - start, 2))
+        logger.info(
+            f"Model loaded ({config.INFERENCE_BACKEND}) "
+            f"in {model_status['load_seconds']}s"
+        )
+
+def load_in_background():
+    """
+    Start loading in a background thread, unless a load is already running.
+    """
+    global _loader
 
-    sentiment_id = torch.argmax(scores).item()
-    confidence = round(scores[sentiment_id].item(), 3)
+    def run():
+        try:
+            load_model()
+        except Exception:
+            pass # Recorded in model_status; retried by require_model
 
-    return LABELS[sentiment_id], confidence
+    with _loader_lock:
+        if runtime is not None or (_loader is not None and _loader.is_alive()):
+            return
+        model_status.update(status="loading", error=None)
+        _loader = threading.Thread(target=run, daemon=True)
+        _loader.start()
+
+def is_ready():
+    return runtime is not None
+
+def require_model():
+    """
+    Raise ModelNotReady unless the model can serve, without waiting for it.
+    Starts a background load if none is running, but retries a failed load
+    at most every MODEL_LOAD_RETRY_SECONDS.
+    """
+    if is_ready():
+        return
+    retry_due = time.monotonic() - _failed_at >= config.MODEL_LOAD_RETRY_SECONDS
+    if model_status["status"] != "failed" or retry_due:
+        load_in_background()
+    raise ModelNotReady(f"Model {model_status['status']}")
+
+def predict_batch(texts):
+    """
+    Classify many tweets, one forward pass per length bucket.
+    Returns [(label, confidence), ...] in input order.
+    """
+    if runtime is None:
+        load_model()
+    if config.INFERENCE_MODE == "cascade":
+        return cascade_classify(
+            linear, transformer_batch, texts,
+            config.CASCADE_THRESHOLD, config.CASCADE_AUDIT_RATE
+        )
+    return transformer_batch(texts)
+
+def transformer_batch(texts):
+    return classify(
+        tokenizer, runtime, texts, config.BATCH_MAX_SIZE, config.MAX_BATCH_TOKENS
+    )
+
+def predict_sentiment(text: str):
+    return predict_batch([text])[0]
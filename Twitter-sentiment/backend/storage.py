@@ -1,10 +1,256 @@
 # backend/storage.py
+import os
+import time
+import queue
+import sqlite3
+import threading
+from collections import deque
 from datetime import datetime
+import config
+from logger import logger
 
-predictions = []
+SENTIMENTS = ("Negative", "Neutral", "Positive")
+
+class MinuteAggregator:
+    """
+    Per-minute sentiment counts in a fixed ring of `retention_minutes` slots.
+    Each slot remembers which minute it holds, so a slot left over from an
+    earlier lap of the ring is reset when its minute comes round again.
+    """
+
+    def __init__(self, retention_minutes=1440):
+        self.size = retention_minutes
+        self._minutes = [-1] * retention_minutes
+        self._counts = [[0, 0, 0] for _ in range(retention_minutes)]
+
+    def add(self, sentiment, timestamp):
+        minute = int(timestamp // 60)
+        slot = minute % self.size
+        if self._minutes[slot] != minute:
+            self._minutes[slot] = minute
+            self._counts[slot] = [0, 0, 0]
+        index = SENTIMENTS.index(sentiment) if sentiment in SENTIMENTS else 0
+        self._counts[slot][index] += 1
+
+    def buckets(self, now):
+        """
+        [(minute, [neg, neu, pos]), ...] for the retained minutes, oldest first.
+        """
+        current = int(now // 60)
+        buckets = []
+        for minute in range(current - self.size + 1, current + 1):
+            slot = minute % self.size
+            if self._minutes[slot] == minute:
+                buckets.append((minute, list(self._counts[slot])))
+        return buckets
+
+class MemoryStore:
+    """
+    Process-local store; history is lost on restart and not shared between workers.
+    """
+
+    def __init__(self, retention_minutes, recent_size):
+        self._lock = threading.Lock()
+        self.aggregator = MinuteAggregator(retention_minutes)
+        self.recent = deque(maxlen=recent_size)
+
+    def add(self, sentiment, timestamp):
+        with self._lock:
+            self.aggregator.add(sentiment, timestamp)
+            self.recent.append((timestamp, sentiment))
+
+    def buckets(self, now):
+        with self._lock:
+            return self.aggregator.buckets(now)
+
+    def recent_items(self, limit):
+        with self._lock:
+            return list(self.recent)[-limit:]
+
+    def close(self):
+        pass
+
+class SQLiteStore:
+    """
+    Durable store in a SQLite file (WAL mode) that every worker process can share.
+
+    `add` only puts the row on a queue; a background thread writes queued rows
+    in one transaction per batch, updating the raw `predictions` table and the
+    per-minute totals in `prediction_minutes` that /stats reads.
+    """
+
+    def __init__(self, path, retention_minutes, batch_size=500, flush_interval=0.2):
+        self.path = str(path)
+        self.retention_minutes = retention_minutes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._closed = False
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS predictions ("
+            " ts REAL NOT NULL, sentiment TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS idx_predictions_ts ON predictions (ts);"
+            "CREATE TABLE IF NOT EXISTS prediction_minutes ("
+            " minute INTEGER PRIMARY KEY, negative INTEGER NOT NULL DEFAULT 0,"
+            " neutral INTEGER NOT NULL DEFAULT 0, positive INTEGER NOT NULL DEFAULT 0);"
+        )
+        conn.close()
+
+        # Reads come from request threads; the writer thread has its own connection
+        self._read_conn = self._connect()
+        self._read_lock = threading.Lock()
+        self._writer = threading.Thread(target=self._run, daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def add(self, sentiment, timestamp):
+        self._queue.put((timestamp, sentiment))
+
+    def buckets(self, now):
+        current = int(now // 60)
+        with self._read_lock:
+            rows = self._read_conn.execute(
+                "SELECT minute, negative, neutral, positive FROM prediction_minutes "
+                "WHERE minute > ? AND minute <= ? ORDER BY minute",
+                (current - self.retention_minutes, current)
+            ).fetchall()
+        return [(minute, [neg, neu, pos]) for minute, neg, neu, pos in rows]
+
+    def recent_items(self, limit):
+        with self._read_lock:
+            rows = self._read_conn.execute(
+                "SELECT ts, sentiment FROM predictions ORDER BY ts DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return rows[::-1]
+
+    def close(self):
+        """
+        Write whatever is still queued and stop the writer thread.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join(timeout=10)
+        self._read_conn.close()
+
+    def _collect(self):
+        # Wait for the first row, then take what else arrives within flush_interval
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while items[-1] is not None and len(items) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    items.append(self._queue.get(timeout=remaining))
+                else:
+                    items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        conn = self._connect()
+        last_trim = 0
+        while True:
+            items = self._collect()
+            stop = items[-1] is None
+            rows = [item for item in items if item is not None]
+            if rows:
+                try:
+                    self._write(conn, rows)
+                except sqlite3.Error:
+                    logger.exception(
+                        f"Could not write {len(rows)} predictions to {self.path}"
+                    )
+            now = time.time()
+            if now - last_trim > 60:
+                self._trim(conn, now)
+                last_trim = now
+            if stop:
+                conn.close()
+                return
+
+    def _write(self, conn, rows):
+        totals = {}
+        for timestamp, sentiment in rows:
+            counts = totals.setdefault(int(timestamp // 60), [0, 0, 0])
+            counts[SENTIMENTS.index(sentiment) if sentiment in SENTIMENTS else 0] += 1
+
+        with conn:
+            conn.executemany(
+                "INSERT INTO predictions (ts, sentiment) VALUES (?, ?)", rows
+            )
+            conn.executemany(
+                "INSERT INTO prediction_minutes (minute, negative, neutral, positive) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (minute) DO UPDATE SET "
+                "negative = negative + excluded.negative, "
+                "neutral = neutral + excluded.neutral, "
+                "positive = positive + excluded.positive",
+                [(minute, *counts) for minute, counts in totals.items()]
+            )
+
+    def _trim(self, conn, now):
+        # Raw rows and minute totals older than the retention window aren't served
+        oldest_minute = int(now // 60) - self.retention_minutes
+        try:
+            with conn:
+                conn.execute(
+                    "DELETE FROM predictions WHERE ts < ?", (oldest_minute * 60,)
+                )
+                conn.execute(
+                    "DELETE FROM prediction_minutes WHERE minute <= ?", (oldest_minute,)
+                )
+        except sqlite3.Error:
+            logger.exception(f"Could not trim {self.path}")
+
+def open_store(backend=config.STORAGE_BACKEND):
+    if backend == "sqlite":
+        return SQLiteStore(config.STORAGE_PATH, config.STATS_RETENTION_MINUTES)
+    if backend == "memory":
+        return MemoryStore(config.STATS_RETENTION_MINUTES, config.RECENT_SIZE)
+    raise ValueError(
+        f"Unknown storage backend '{backend}'. Choose 'sqlite' or 'memory'."
+    )
+
+store = open_store()
 
 def add_prediction(sentiment):
-    predictions.append({
-        "time": datetime.now(),
-        "sentiment": sentiment
-    })
+    store.add(sentiment, time.time())
+
+def stats_by_minute():
+    response = []
+    for minute, (neg, neu, pos) in store.buckets(time.time()):
+        total = neg + neu + pos
+        start = datetime.fromtimestamp(minute * 60)
+        response.append({
+            "time": start.strftime("%H:%M"),
+            "minute": start.isoformat(),
+            "positive_count": pos,
+            "neutral_count": neu,
+            "negative_count": neg,
+            "total_count": total,
+            "positive_pct": round((pos / total) * 100, 2),
+            "neutral_pct": round((neu / total) * 100, 2),
+            "negative_pct": round((neg / total) * 100, 2)
+        })
+    return response
+
+def recent_predictions(limit=10):
+    return [
+        {"time": datetime.fromtimestamp(timestamp).isoformat(), "sentiment": sentiment}
+        for timestamp, sentiment in store.recent_items(limit)
+    ]
+
+def close():
+    store.close()
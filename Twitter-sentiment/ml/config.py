@@ -2,3 +2,6 @@ from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_PATH = BASE_DIR / "data" / "twitter.csv"
+# Cleaned and stemmed corpus cached by train.py, keyed by the CSV's hash and the
+# preprocessing settings
+CACHE_DIR = BASE_DIR / "data" / "cache"